@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_FILE = 'analysis_cache.json'
+
+def normalize_for_hash(text):
+    """Normalise un texte avant hachage (casse et espaces)"""
+    return ' '.join((text or '').lower().split())
+
+def analysis_cache_key(topic_id, model, prompt_version):
+    """Clé de cache : empreinte du contenu normalisé + modèle + version du prompt"""
+    return hashlib.sha256(f"{model}|{prompt_version}|{topic_id}".encode('utf-8')).hexdigest()
+
+class AnalysisCache:
+    """Cache persistant des analyses ChatGPT, indexé par le contenu de l'article
+
+    Les entrées plus anciennes que max_age secondes sont ignorées, et au-delà
+    de max_entries les entrées les moins récemment utilisées sont supprimées
+    à la sauvegarde.
+    """
+
+    def __init__(self, file_path=ANALYSIS_CACHE_FILE, max_entries=1000, max_age=7 * 24 * 3600):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("entries", {}) if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Cache des analyses illisible, il sera reconstruit: {str(e)}")
+            return {}
+
+    def get(self, key):
+        """Retourne l'analyse en cache (dictionnaire) ou None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry["created"] > self.max_age:
+                self.misses += 1
+                return None
+            entry["last_used"] = now
+            self._dirty = True
+            self.hits += 1
+            return dict(entry["analysis"])
+
+    def put(self, key, analysis):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {"analysis": analysis, "created": now, "last_used": now}
+            self._dirty = True
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        now = time.time()
+        self._entries = {key: entry for key, entry in self._entries.items() if now - entry["created"] <= self.max_age}
+        if len(self._entries) > self.max_entries:
+            kept = sorted(self._entries.items(), key=lambda item: item[1]["last_used"], reverse=True)[:self.max_entries]
+            self._entries = dict(kept)
+
+    def save(self):
+        """Applique l'éviction et sauvegarde le cache sur disque si nécessaire"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._evict()
+            atomic_write_json(self.file_path, {"entries": self._entries}, ensure_ascii=False)
+            self._dirty = False
+
+    def report(self):
+        """Résumé des succès/échecs du cache pour l'exécution en cours"""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Cache des analyses: {self.hits} succès, {self.misses} échecs ({rate:.0f}% de succès), {len(self._entries)} entrées"
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+def get_analysis_cache():
+    """Retourne le cache des analyses partagé (ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_MAX_AGE_DAYS)"""
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            try:
+                max_entries = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1000").split('#')[0].strip())
+                max_age_days = float(os.getenv("ANALYSIS_CACHE_MAX_AGE_DAYS", "7").split('#')[0].strip())
+            except ValueError:
+                max_entries, max_age_days = 1000, 7
+            _analysis_cache = AnalysisCache(max_entries=max_entries, max_age=max_age_days * 24 * 3600)
+        return _analysis_cache
+
+def reset_analysis_cache():
+    """Sauvegarde puis oublie le cache partagé (recréé avec la configuration courante)"""
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is not None:
+            _analysis_cache.save()
+        _analysis_cache = None
@@ -1,10 +1,14 @@
 import json
 import os
 from datetime import datetime
-from bs4 import BeautifulSoup
-import re
+import bisect
+import threading
+from file_utils import atomic_write_json
+from text_normalizer import clean_article_content, clean_quotes
+from metrics import timed, timer
 
 PROCESSED_ARTICLES_FILE = "processed_articles.json"
+JOURNAL_COMPACT_THRESHOLD = 200  # Nombre d'opérations journalisées avant compaction
 
 def load_processed_articles(file_path):
     """Charge la liste des articles déjà traités"""
@@ -25,42 +29,241 @@ def save_processed_articles(data, file_path):
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=4)  # Ajout de ensure_ascii=False pour préserver les accents
 
-def clean_article_content(content):
-    """Nettoie le contenu d'un article des balises HTML et du texte indésirable"""
-    if not content:
-        return ""
-    
-    # Si c'est un objet BeautifulSoup ou Tag, obtenir le texte
-    if hasattr(content, 'get_text'):
-        try:
-            content = content.get_text(separator=' ', strip=True)
-        except:
-            content = str(content)
-    
-    # Convertir en string si ce n'est pas déjà le cas
-    content = str(content)
-    
-    # Nettoyer les balises HTML restantes
-    content = re.sub(r'<[^>]+>', ' ', content)
-    
-    # Supprimer les contenus liés aux cookies et consentements
-    patterns_to_remove = [
-        r'Ce contenu est bloqué.*?Gérer mes choix',
-        r'Les informations recueillies sont destinées.*?politique Cookies',
-        r'En poursuivant votre navigation.*?cookies',
-        r'Vous gardez la possibilité.*?tout moment',
-    ]
-    
-    for pattern in patterns_to_remove:
-        content = re.sub(pattern, '', content, flags=re.DOTALL)
-    
-    # Nettoyer les caractères spéciaux et espacements
-    content = content.replace('\n', ' ')
-    content = content.replace('\r', ' ')
-    content = content.replace('\t', ' ')
-    content = ' '.join(content.split())
-    
-    return content.strip()
+class ArticleStore:
+    """Stockage indexé des articles traités
+
+    Les articles sont chargés une seule fois depuis processed_articles.json et
+    indexés en mémoire par URL, notion_id, source et date. Toutes les lectures
+    se font sur les index, le fichier n'est relu qu'au chargement.
+
+    Les modifications sont ajoutées à un journal JSON Lines
+    (processed_articles.journal.jsonl) : ajouter un article n'écrit que cet
+    article. Le journal est rejoué au chargement puis fusionné dans le fichier
+    principal (écriture atomique) tous les JOURNAL_COMPACT_THRESHOLD ajouts.
+    """
+
+    def __init__(self, file_path=PROCESSED_ARTICLES_FILE, compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        self.file_path = file_path
+        self.journal_path = os.path.splitext(file_path)[0] + ".journal.jsonl"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.load()
+
+    def subscribe(self, listener):
+        """Abonne un objet aux modifications du stockage
+
+        Le listener reçoit articles_reloaded(articles) immédiatement puis à chaque
+        rechargement, et article_added(article) / article_removed(article).
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            listener.articles_reloaded(self.articles())
+
+    def _notify(self, event, *args):
+        for listener in self._listeners:
+            getattr(listener, event)(*args)
+
+    @timed("store_load")
+    def load(self):
+        """(Re)charge les articles depuis le fichier et le journal, puis reconstruit les index"""
+        with self._lock:
+            self._articles = {}
+            self._by_notion_id = {}
+            self._by_source = {}
+            self._by_date = []
+            self._journal_count = 0
+            for article in load_processed_articles(self.file_path).get("articles", []):
+                if isinstance(article, dict) and article.get("url"):
+                    self._index(article)
+            journal_intact = self._replay_journal()
+            if not journal_intact or self._journal_count >= self.compact_threshold:
+                self.compact()
+            self._signature = self._files_signature()
+            self._notify("articles_reloaded", self.articles())
+
+    def _files_signature(self):
+        """(mtime, taille) du fichier et du journal, pour détecter les écritures d'un autre processus"""
+        signature = []
+        for path in (self.file_path, self.journal_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload_if_changed(self):
+        """Recharge le stockage si le fichier ou le journal ont été modifiés ailleurs
+        (notion_cleaner pendant que le démon attend), retourne True en cas de rechargement"""
+        with self._lock:
+            if self._files_signature() == self._signature:
+                return False
+            print(f"{self.file_path} modifié par un autre processus, rechargement")
+            self.load()
+            return True
+
+    def _replay_journal(self):
+        """Rejoue le journal, retourne False si une ligne corrompue a été ignorée"""
+        intact = True
+        if not os.path.exists(self.journal_path):
+            return intact
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne incomplète après un arrêt brutal
+                    print(f"Ligne de journal ignorée (incomplète) dans {self.journal_path}")
+                    intact = False
+                    continue
+                if record.get("op") == "add" and record.get("article", {}).get("url"):
+                    self._index(record["article"])
+                elif record.get("op") == "remove":
+                    for url in record.get("urls", []):
+                        self._unindex(url)
+                self._journal_count += 1
+        return intact
+
+    def _append_journal(self, record):
+        with timer("store_journal_append"), open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_count += 1
+        if self._journal_count >= self.compact_threshold:
+            self.compact()
+        self._signature = self._files_signature()
+
+    def _index(self, article):
+        url = article["url"]
+        if url in self._articles:
+            self._unindex(url)
+        self._articles[url] = article
+        if article.get("notion_id"):
+            self._by_notion_id[article["notion_id"]] = url
+        self._by_source.setdefault(article.get("source", ""), set()).add(url)
+        bisect.insort(self._by_date, (article.get("date") or "", url))
+
+    def _unindex(self, url):
+        article = self._articles.pop(url, None)
+        if article is None:
+            return None
+        if article.get("notion_id"):
+            self._by_notion_id.pop(article["notion_id"], None)
+        urls = self._by_source.get(article.get("source", ""))
+        if urls is not None:
+            urls.discard(url)
+        key = (article.get("date") or "", url)
+        position = bisect.bisect_left(self._by_date, key)
+        if position < len(self._by_date) and self._by_date[position] == key:
+            del self._by_date[position]
+        return article
+
+    def __len__(self):
+        return len(self._articles)
+
+    def __contains__(self, url):
+        return url in self._articles
+
+    def contains(self, url):
+        """Vérifie si un article a déjà été traité"""
+        return url in self._articles
+
+    def get(self, url):
+        """Retourne l'article correspondant à l'URL ou None"""
+        return self._articles.get(url)
+
+    def get_by_notion_id(self, notion_id):
+        """Retourne l'article correspondant à l'ID de page Notion ou None"""
+        with self._lock:
+            url = self._by_notion_id.get(notion_id)
+            return self._articles.get(url) if url else None
+
+    def get_by_source(self, source):
+        """Retourne les articles d'un flux donné"""
+        with self._lock:
+            return [self._articles[url] for url in self._by_source.get(source, ())]
+
+    def oldest(self, count):
+        """Retourne les count articles les plus anciens (tri par date)"""
+        with self._lock:
+            return [self._articles[url] for _, url in self._by_date[:count]]
+
+    def articles(self):
+        """Retourne la liste des articles dans l'ordre d'ajout"""
+        with self._lock:
+            return list(self._articles.values())
+
+    def titles(self):
+        """Retourne les titres des articles dans l'ordre d'ajout"""
+        with self._lock:
+            return [article.get("title", "Sans titre") for article in self._articles.values()]
+
+    def add(self, article):
+        """Ajoute (ou remplace) un article en l'ajoutant au journal"""
+        with self._lock:
+            self._index(article)
+            self._append_journal({"op": "add", "article": article})
+            self._notify("article_added", article)
+
+    def remove(self, url):
+        """Supprime un article par son URL, retourne True s'il existait"""
+        return self.remove_many([url]) == 1
+
+    def remove_many(self, urls):
+        """Supprime plusieurs articles avec une seule entrée de journal"""
+        with self._lock:
+            removed = [article for article in (self._unindex(url) for url in urls) if article is not None]
+            if removed:
+                self._append_journal({"op": "remove", "urls": [article["url"] for article in removed]})
+            for article in removed:
+                self._notify("article_removed", article)
+            return len(removed)
+
+    def clear(self):
+        """Vide le stockage"""
+        with self._lock:
+            self._articles = {}
+            self._by_notion_id = {}
+            self._by_source = {}
+            self._by_date = []
+            self._journal_count = 0
+            for path in (self.file_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._signature = self._files_signature()
+            self._notify("articles_reloaded", [])
+
+    def to_dict(self):
+        return {"articles": self.articles()}
+
+    @timed("store_compact")
+    def compact(self):
+        """Écrit un instantané complet (atomique) puis vide le journal"""
+        with self._lock:
+            atomic_write_json(self.file_path, self.to_dict(), ensure_ascii=False, indent=4)
+            # Le journal n'est vidé qu'une fois l'instantané en place : un arrêt
+            # entre les deux étapes ne fait que rejouer des opérations idempotentes
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_count = 0
+            self._signature = self._files_signature()
+
+    def save(self):
+        """Sauvegarde les articles dans le fichier JSON"""
+        self.compact()
+
+_article_store = None
+_article_store_lock = threading.Lock()
+
+def get_article_store():
+    """Retourne le stockage des articles partagé par tout le processus"""
+    global _article_store
+    with _article_store_lock:
+        if _article_store is None:
+            _article_store = ArticleStore(PROCESSED_ARTICLES_FILE)
+        return _article_store
 
 def clean_analysis(analysis):
     """Nettoie et formate l'analyse"""
@@ -93,29 +296,8 @@ def format_date(date):
     except:
         return None
 
-def clean_quotes(text):
-    """Nettoie et normalise les guillemets dans le texte"""
-    if not text:
-        return ""
-    
-    # Remplacer tous les types de guillemets par des guillemets simples
-    replacements = {
-        '"': "'",  # guillemet droit double
-        '"': "'",  # guillemet courbe gauche
-        '"': "'",  # guillemet courbe droit
-        '«': "'",  # guillemet français ouvrant
-        '»': "'",  # guillemet français fermant
-    }
-    
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    return text
-
 def add_processed_article(url, title=None, content=None, analysis=None, date=None, image_url=None, source=None, notion_id=None, is_double=False):
     """Ajoute un article complet à la liste des traités avec formatage amélioré"""
-    articles_data = load_processed_articles(PROCESSED_ARTICLES_FILE)
-    
     # Nettoyer les guillemets du titre et du contenu
     title = clean_quotes(title) if title else ""
     content = clean_quotes(clean_article_content(content)) if content else ""
@@ -141,15 +323,12 @@ def add_processed_article(url, title=None, content=None, analysis=None, date=Non
     # Supprimer les clés avec valeurs None/vides    
     article_data = {k:v for k,v in article_data.items() if v is not None and v != ""}
         
-    articles_data["articles"].append(article_data)
-    save_processed_articles(articles_data, PROCESSED_ARTICLES_FILE)
+    get_article_store().add(article_data)
 
 def is_article_processed(url):
     """Vérifie si un article a déjà été traité"""
-    articles_data = load_processed_articles(PROCESSED_ARTICLES_FILE)
-    return any(article.get("url") == url for article in articles_data["articles"])
+    return get_article_store().contains(url)
 
 def clear_processed_articles():
     """Supprime la liste des articles traités"""
-    if os.path.exists(PROCESSED_ARTICLES_FILE):
-        os.remove(PROCESSED_ARTICLES_FILE)
+    get_article_store().clear()
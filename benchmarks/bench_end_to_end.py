@@ -0,0 +1,186 @@
+"""Benchmark de bout en bout de process_new_articles, entièrement hors ligne
+
+Les flux, les pages d'articles, l'API OpenAI et l'API Notion sont servis par un
+serveur local (benchmarks/standins.py) avec une latence et des 429 configurables.
+Le traitement s'exécute dans un répertoire temporaire (suivi et caches vides).
+Affiche le débit (articles/s), les latences p50/p95 par étape et le pic de mémoire.
+Avec --llm-mode batch, les analyses passent par l'API Batch du serveur local
+(l'étape llm mesure alors le lot entier).
+
+Usage :
+    python benchmarks/bench_end_to_end.py [--feeds N] [--items N] [--max-per-feed N]
+        [--llm-latency S] [--notion-latency S] [--rate-limit-every N] [--retry-after S]
+        [--llm-mode concurrent|batch]
+        [--env NOM=VALEUR ...] [--output resultats.json] [--baseline reference.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from standins import StandinConfig, start_standins  # noqa: E402
+
+class StageTimer:
+    """Enregistre la durée de chaque appel des fonctions instrumentées, par étape"""
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.durations.setdefault(stage, []).append(elapsed)
+        return timed
+
+def percentile(values, fraction):
+    """Percentile au rang le plus proche"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def configure_environment(args, base_url):
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "NOTION_API_KEY": "bench",
+        "NOTION_DATABASE_ID": "bench-database",
+        "NOTION_API_URL": f"{base_url}/notion/v1",
+        "MAX_ARTICLES_PER_FEED": str(args.max_per_feed),
+        "AUTO_CLEAN_THRESHOLD": "1000000",
+        "ENABLE_CHATGPT_LOGS": "false",
+        "OPENAI_BATCH_POLL_INTERVAL": "1",
+    })
+    for assignment in args.env or []:
+        name, _, value = assignment.partition('=')
+        os.environ[name] = value
+
+def run(args):
+    config = StandinConfig(
+        items_per_feed=args.items,
+        llm_latency=args.llm_latency,
+        notion_latency=args.notion_latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+    )
+    server, base_url = start_standins(config)
+    workdir = tempfile.mkdtemp(prefix='bench-e2e-')
+    os.chdir(workdir)
+    configure_environment(args, base_url)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    def quiet():
+        return contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with quiet():
+        import main
+        import rss_reader
+        import chatgpt_processor
+        from article_tracker import get_article_store
+
+    # Le .env du dépôt ne doit pas remplacer la configuration du benchmark
+    main.load_dotenv = lambda *a, **k: None
+    main.RSS_FEEDS = [{"url": f"{base_url}/feeds/{i}.xml", "name": f"Flux {i}"} for i in range(args.feeds)]
+
+    timer = StageTimer()
+    rss_reader.fetch_rss_feed = timer.wrap("fetch", rss_reader.fetch_rss_feed)
+    main.scrape_article = timer.wrap("scrape", main.scrape_article)
+    main.analyze_article = timer.wrap("llm", main.analyze_article)
+    chatgpt_processor.process_batch_with_chatgpt = timer.wrap("llm", chatgpt_processor.process_batch_with_chatgpt)
+    main.publish_article = timer.wrap("notion", main.publish_article)
+
+    start = time.perf_counter()
+    with quiet():
+        main.process_new_articles(llm_mode=args.llm_mode)
+    elapsed = time.perf_counter() - start
+    server.terminate()
+    articles = len(get_article_store())
+    os.chdir(BENCH_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "articles": articles,
+        "seconds": elapsed,
+        "articles_per_second": articles / elapsed if elapsed else 0.0,
+        # ru_maxrss est en kilo-octets sous Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": {
+            stage: {
+                "count": len(durations),
+                "p50_ms": percentile(durations, 0.5) * 1000,
+                "p95_ms": percentile(durations, 0.95) * 1000,
+            }
+            for stage, durations in timer.durations.items()
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "verbose")},
+    }
+
+def print_report(results, baseline=None):
+    def delta(current, reference):
+        if not reference:
+            return ""
+        return f"  ({(current - reference) / reference * 100:+.0f}%)"
+
+    base_stages = (baseline or {}).get("stages", {})
+    print(f"Articles publiés : {results['articles']} en {results['seconds']:.2f}s")
+    print(f"Débit            : {results['articles_per_second']:.2f} articles/s"
+          + delta(results['articles_per_second'], (baseline or {}).get('articles_per_second')))
+    print(f"Pic mémoire      : {results['peak_rss_mb']:.0f} MB" + delta(results['peak_rss_mb'], (baseline or {}).get('peak_rss_mb')))
+    print(f"{'Étape':<8} {'appels':>6} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for stage in ("fetch", "scrape", "llm", "notion"):
+        stats = results["stages"].get(stage)
+        if not stats:
+            continue
+        reference = base_stages.get(stage, {})
+        print(f"{stage:<8} {stats['count']:>6} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f}"
+              + delta(stats['p95_ms'], reference.get('p95_ms')))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, default=10)
+    parser.add_argument('--items', type=int, default=20, help="articles par flux")
+    parser.add_argument('--max-per-feed', type=int, default=5)
+    parser.add_argument('--llm-latency', type=float, default=0.3)
+    parser.add_argument('--notion-latency', type=float, default=0.1)
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="un 429 toutes les N requêtes OpenAI/Notion")
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--llm-mode', choices=["concurrent", "batch"], default="concurrent")
+    parser.add_argument('--env', nargs='+', metavar='NOM=VALEUR', help="variables de configuration supplémentaires")
+    parser.add_argument('--output', help="enregistre les résultats en JSON")
+    parser.add_argument('--baseline', help="résultats JSON de référence à comparer")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = run(args)
+    print_report(results, baseline)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Résultats enregistrés dans {output}")
+
+if __name__ == "__main__":
+    main()
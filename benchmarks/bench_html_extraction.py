@@ -0,0 +1,77 @@
+"""Benchmark de l'extraction HTML : lxml (un seul parcours) contre BeautifulSoup
+
+Usage :
+    python benchmarks/bench_html_extraction.py [--repeat N]
+    python benchmarks/bench_html_extraction.py --record URL [URL ...]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from fixtures import HTML_FIXTURES_DIR, load_html_fixtures  # noqa: E402
+from text_normalizer import clean_article_content  # noqa: E402
+from html_extractor import extract_article, LXML_AVAILABLE  # noqa: E402
+from scraper import extract_article_with_soup, is_valid_image_url  # noqa: E402
+
+def record_pages(urls):
+    """Enregistre des pages réelles dans benchmarks/fixtures/html"""
+    from http_client import http_get
+    os.makedirs(HTML_FIXTURES_DIR, exist_ok=True)
+    for url in urls:
+        response = http_get(url)
+        response.raise_for_status()
+        name = re.sub(r'[^a-zA-Z0-9]+', '-', url.split('://', 1)[-1]).strip('-')[:80] + '.html'
+        with open(os.path.join(HTML_FIXTURES_DIR, name), 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"Page enregistrée: {name} ({len(response.text) / 1024:.0f} KB)")
+
+def bench(func, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, html in pages:
+            func(html, 'https://www.example.com/' + name)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--record', nargs='+', metavar='URL')
+    args = parser.parse_args()
+
+    if args.record:
+        record_pages(args.record)
+        return
+
+    if not LXML_AVAILABLE:
+        print("lxml n'est pas installé : seul le chemin BeautifulSoup est disponible")
+        return
+
+    pages = load_html_fixtures()
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages ({total_kb:.0f} KB au total), {args.repeat} répétitions")
+
+    def fast(html, url):
+        return extract_article(html, url, is_valid_image_url, clean_article_content)
+
+    differences = 0
+    for name, html in pages:
+        url = 'https://www.example.com/' + name
+        if fast(html, url) != extract_article_with_soup(html, url):
+            differences += 1
+            print(f"  Résultat différent pour {name}")
+
+    soup_time = bench(extract_article_with_soup, pages, args.repeat)
+    fast_time = bench(fast, pages, args.repeat)
+    print(f"BeautifulSoup (html.parser): {soup_time * 1000:8.2f} ms/page")
+    print(f"lxml un seul parcours      : {fast_time * 1000:8.2f} ms/page")
+    print(f"Accélération: x{soup_time / fast_time:.1f}, résultats identiques: {len(pages) - differences}/{len(pages)}")
+
+if __name__ == "__main__":
+    main()
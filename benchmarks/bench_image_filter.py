@@ -0,0 +1,119 @@
+"""Benchmark du filtre d'URLs d'images unifié (image_filter) contre les anciens filtres
+
+Vérifie d'abord que les règles des flux (is_valid_image_url) et des pages
+(is_valid_page_image_url) prennent les mêmes décisions que les anciens filtres de
+rss_reader et de scraper sur benchmarks/fixtures/image_urls.txt ; le script
+s'arrête avec le code 1 sinon.
+Une variante en une seule alternance regex est mesurée aussi : en CPython elle est
+plus lente que les tests `in` sur des tables précalculées, retenus dans image_filter.
+
+Usage :
+    python benchmarks/bench_image_filter.py [--repeat N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from fixtures import generate_article_page, load_image_urls  # noqa: E402
+from image_filter import is_valid_image_url, is_valid_page_image_url, EXCLUDED_PATTERNS, EXCLUDED_SIZES, EXCLUDED_EXTENSIONS  # noqa: E402
+from rss_reader import extract_image_from_html, IMG_SRC_PATTERN  # noqa: E402
+
+LEGACY_PATTERNS = ['logo', 'logos', 'favicon', 'fzn', 'header', 'footer', 'icon', 'banner',
+                   '-min.png', 'site-icon', 'site-logo', 'brand']
+
+def legacy_rss_reader_filter(url):
+    """Ancienne version de rss_reader.is_valid_image_url"""
+    if not url:
+        return False
+    url_lower = url.lower()
+    for pattern in LEGACY_PATTERNS:
+        if pattern in url_lower:
+            return False
+    if 'icon' in url_lower or any(dim in url_lower for dim in ['16x16', '32x32', '64x64']):
+        return False
+    if url_lower.endswith(('.ico', '.svg')):
+        return False
+    return True
+
+def legacy_scraper_filter(url):
+    """Ancienne version de scraper.is_valid_image_url (sensible à la casse)"""
+    if not url:
+        return False
+    if 'developpez.com' in url:
+        if '/public/images/' in url:
+            return True
+        if '/images/logos/' in url:
+            return False
+    for pattern in LEGACY_PATTERNS:
+        if pattern in url:
+            return False
+    return True
+
+REGEX_EXCLUDED = re.compile(
+    '|'.join(re.escape(pattern) for pattern in EXCLUDED_PATTERNS + EXCLUDED_SIZES)
+    + '|(?:' + '|'.join(re.escape(extension) + '$' for extension in EXCLUDED_EXTENSIONS) + ')'
+)
+
+def regex_filter(url):
+    """Variante des règles des flux : une seule alternance regex"""
+    return bool(url) and REGEX_EXCLUDED.search(url.lower()) is None
+
+def legacy_extract_image_from_html(html_content):
+    for match in IMG_SRC_PATTERN.finditer(html_content):
+        if legacy_rss_reader_filter(match.group(1)):
+            return match.group(1)
+    return None
+
+def bench(func, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    urls = load_image_urls()
+    print(f"{len(urls)} URLs, {args.repeat} répétitions")
+    regressions = 0
+    for name, legacy, current in (('rss_reader', legacy_rss_reader_filter, is_valid_image_url),
+                                  ('scraper', legacy_scraper_filter, is_valid_page_image_url)):
+        changed = [url for url in urls if legacy(url) != current(url)]
+        accepted = sum(1 for url in urls if current(url))
+        print(f"  Filtre {name}: {accepted} acceptées, {len(changed)} décisions différentes de l'ancien filtre")
+        for url in changed:
+            print(f"    {'acceptée' if current(url) else 'refusée '} {url}")
+        regressions += len(changed)
+
+    results = [
+        ("ancien filtre rss_reader", bench(legacy_rss_reader_filter, urls, args.repeat)),
+        ("alternance regex", bench(regex_filter, urls, args.repeat)),
+        ("image_filter (flux)", bench(is_valid_image_url, urls, args.repeat)),
+        ("ancien filtre scraper", bench(legacy_scraper_filter, urls, args.repeat)),
+        ("image_filter (pages)", bench(is_valid_page_image_url, urls, args.repeat)),
+    ]
+    for label, seconds in results:
+        print(f"{label:<26}: {seconds * 1e6:7.2f} µs/URL")
+
+    # Page longue dont les images valides sont à la fin : toutes les balises sont filtrées
+    page = generate_article_page(0, paragraphs=0, images=0).replace('hero', 'header-hero')
+    pages = [page] * 10
+    legacy_time = bench(legacy_extract_image_from_html, pages, max(1, args.repeat // 100))
+    new_time = bench(extract_image_from_html, pages, max(1, args.repeat // 100))
+    print(f"Page avec {len(IMG_SRC_PATTERN.findall(page))} balises img: {legacy_time * 1000:.3f} ms -> {new_time * 1000:.3f} ms "
+          f"(x{legacy_time / new_time:.2f})")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
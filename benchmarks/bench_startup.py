@@ -0,0 +1,96 @@
+"""Benchmark du temps de démarrage (import de main.py), à partir du rapport -X importtime
+
+Chaque mesure lance un nouvel interpréteur. Affiche le temps d'import médian, les
+paquets les plus coûteux (temps propre cumulé par paquet de premier niveau) et
+vérifie que les dépendances lourdes chargées au premier usage (openai, tiktoken,
+PIL, bs4) ne sont pas importées au démarrage.
+
+Usage :
+    python benchmarks/bench_startup.py [--module main] [--repeat N] [--top N]
+        [--output resultats.json] [--baseline reference.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Dépendances qui ne doivent être chargées que lorsqu'il y a des articles à traiter
+DEFERRED_MODULES = ["openai", "tiktoken", "PIL", "bs4", "chatgpt_processor", "notion_cleaner", "analysis_cache"]
+
+def measure_import(module):
+    """Importe module dans un nouvel interpréteur, retourne ({module: (propre, cumulé)} en µs, modules chargés)"""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, loaded
+
+def run(args):
+    totals = []
+    packages = {}
+    loaded = []
+    for _ in range(args.repeat):
+        timings, loaded = measure_import(args.module)
+        totals.append(timings[args.module][1])
+        run_packages = {}
+        for name, (self_us, _) in timings.items():
+            package = name.split(".")[0]
+            run_packages[package] = run_packages.get(package, 0) + self_us
+        for package, self_us in run_packages.items():
+            packages.setdefault(package, []).append(self_us)
+    by_package = {package: statistics.median(values) / 1000 for package, values in packages.items()}
+    return {
+        "module": args.module,
+        "import_ms": statistics.median(totals) / 1000,
+        "packages_ms": dict(sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]),
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+def print_report(results, baseline=None):
+    reference = (baseline or {}).get("import_ms")
+    delta = f"  ({(results['import_ms'] - reference) / reference * 100:+.0f}%)" if reference else ""
+    print(f"Import de {results['module']} : {results['import_ms']:.1f} ms (médiane){delta}")
+    print(f"{'Paquet':<24} {'ms':>8}")
+    for package, milliseconds in results["packages_ms"].items():
+        print(f"{package:<24} {milliseconds:>8.1f}")
+    if results["deferred_loaded"]:
+        print("Chargés au démarrage alors qu'ils devraient l'être au premier usage : " + ", ".join(results["deferred_loaded"]))
+    else:
+        print("Aucune dépendance différée chargée au démarrage")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default="main")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="nombre de paquets affichés")
+    parser.add_argument('--output', help="enregistre les résultats en JSON")
+    parser.add_argument('--baseline', help="résultats JSON de référence à comparer")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = run(args)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Résultats enregistrés dans {args.output}")
+
+if __name__ == "__main__":
+    main()
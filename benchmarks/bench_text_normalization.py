@@ -0,0 +1,119 @@
+"""Benchmark de la normalisation du texte (text_normalizer) sur des articles de plus de 100 KB
+
+Compare les anciennes fonctions (regex compilées à chaque appel, replace successifs,
+filtrage des caractères de contrôle caractère par caractère) à text_normalizer, et
+mesure aussi str.translate, plus lent que des replace sur du texte non ASCII.
+
+Usage :
+    python benchmarks/bench_text_normalization.py [--repeat N] [--size KB]
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import generate_article_page  # noqa: E402
+from text_normalizer import clean_article_content, clean_quotes, clean_text, QUOTE_CHARACTERS  # noqa: E402
+
+def legacy_clean_article_content(content):
+    """Ancienne version de article_tracker.clean_article_content"""
+    if not content:
+        return ""
+    content = str(content)
+    content = re.sub(r'<[^>]+>', ' ', content)
+    patterns_to_remove = [
+        r'Ce contenu est bloqué.*?Gérer mes choix',
+        r'Les informations recueillies sont destinées.*?politique Cookies',
+        r'En poursuivant votre navigation.*?cookies',
+        r'Vous gardez la possibilité.*?tout moment',
+    ]
+    for pattern in patterns_to_remove:
+        content = re.sub(pattern, '', content, flags=re.DOTALL)
+    content = content.replace('\n', ' ')
+    content = content.replace('\r', ' ')
+    content = content.replace('\t', ' ')
+    content = ' '.join(content.split())
+    return content.strip()
+
+def legacy_clean_quotes(text):
+    """Ancienne version de article_tracker.clean_quotes (clés du dictionnaire en double)"""
+    if not text:
+        return ""
+    for old, new in {'"': "'", '«': "'", '»': "'"}.items():
+        text = text.replace(old, new)
+    return text
+
+def legacy_clean_text(text):
+    """Ancienne version de notion_integration.clean_text"""
+    if not text:
+        return ""
+    text = html.unescape(text)
+    text = re.sub(r'&#\d+;', "'", text)
+    text = ''.join(char for char in text if ord(char) >= 32 or char in '\n\t')
+    return text.strip()
+
+QUOTES_TABLE = str.maketrans({quote: "'" for quote in QUOTE_CHARACTERS})
+
+def translate_quotes(text):
+    return text.translate(QUOTES_TABLE)
+
+def legacy_pipeline(page):
+    """Chemin d'un article avant : scraper, suivi (guillemets), puis écriture Notion"""
+    content = legacy_clean_article_content(page)
+    stored = legacy_clean_quotes(legacy_clean_article_content(content))
+    return stored, legacy_clean_text(content)
+
+def new_pipeline(page):
+    content = clean_article_content(page)
+    stored = clean_quotes(clean_article_content(content))
+    return stored, clean_text(content)
+
+def make_body(index, size_kb):
+    """Article HTML d'au moins size_kb KB avec bandeaux de cookies, guillemets et caractères de contrôle"""
+    paragraphs = 40
+    while True:
+        page = generate_article_page(index, paragraphs=paragraphs, images=0)
+        page = page.replace('</p>', ' « Citation » et "texte" \x0b\x07&amp;&#039;</p>', paragraphs // 2)
+        page = page.replace('<div class="cookie-notice">', '<div>En poursuivant votre navigation vous acceptez les cookies</div><div class="cookie-notice">')
+        if len(page) >= size_kb * 1024:
+            return page
+        paragraphs *= 2
+
+def bench(func, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size', type=int, default=120, help="taille minimale d'un article en KB")
+    args = parser.parse_args()
+
+    pages = [make_body(i, args.size) for i in range(5)]
+    texts = [clean_article_content(page) for page in pages]
+    print(f"{len(pages)} articles ({sum(len(page) for page in pages) / len(pages) / 1024:.0f} KB en moyenne), {args.repeat} répétitions")
+
+    identical = sum(1 for page in pages if legacy_pipeline(page) == new_pipeline(page))
+    print(f"Résultats identiques: {identical}/{len(pages)}")
+
+    rows = [
+        ("clean_article_content", legacy_clean_article_content, clean_article_content, pages),
+        ("clean_text", legacy_clean_text, clean_text, texts),
+        ("clean_quotes", legacy_clean_quotes, clean_quotes, texts),
+        ("guillemets (str.translate)", legacy_clean_quotes, translate_quotes, texts),
+        ("chemin complet d'un article", legacy_pipeline, new_pipeline, pages),
+    ]
+    for label, legacy, new, items in rows:
+        legacy_time = bench(legacy, items, args.repeat)
+        new_time = bench(new, items, args.repeat)
+        print(f"{label:<28}: {legacy_time * 1000:7.2f} ms -> {new_time * 1000:7.2f} ms (x{legacy_time / new_time:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Pages et flux de test pour les benchmarks
+
+Les pages enregistrées (python benchmarks/bench_html_extraction.py --record URL)
+sont placées dans benchmarks/fixtures/html. Si aucune page n'a été enregistrée,
+des pages générées au format WordPress servent de remplacement.
+"""
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+HTML_FIXTURES_DIR = os.path.join(FIXTURES_DIR, 'html')
+IMAGE_URLS_FILE = os.path.join(FIXTURES_DIR, 'image_urls.txt')
+
+WORDS = (
+    "le la les un une des smartphone processeur écran batterie mise à jour "
+    "Apple Google Samsung annonce lancement prix performances test nouvelle "
+    "version application système intelligence artificielle données réseau "
+    "Formule 1 Grand Prix pilote écurie qualifications course satellite fusée"
+).split()
+
+def _sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize() + '.'
+
+def generate_article_page(index, paragraphs=40, images=30, seed=0):
+    """Génère une page d'article réaliste (menus, scripts, images, contenu)"""
+    rng = random.Random(seed + index)
+    nav = ''.join(
+        f'<li class="menu-item"><a href="/rubrique-{i}/"><img src="https://cdn.example.com/icons/icon-{i}-32x32.png" alt="">Rubrique {i}</a></li>'
+        for i in range(60)
+    )
+    body = ''.join(
+        f'<p>{_sentence(rng, rng.randint(20, 60))} <a href="/lien-{i}">{_sentence(rng, 3)}</a></p>'
+        + (f'<figure class="wp-block-image"><img src="https://cdn.example.com/uploads/2024/{index}/photo-{i}.jpg" alt=""></figure>' if i % 3 == 0 else '')
+        for i in range(paragraphs)
+    )
+    sidebar = ''.join(
+        f'<div class="widget"><img src="https://cdn.example.com/uploads/related-{i}.jpg"><h4>{_sentence(rng, 6)}</h4></div>'
+        for i in range(images)
+    )
+    scripts = ''.join(f'<script>var tracker{i} = {{"id": {i}, "data": "{"x" * 200}"}};</script>' for i in range(20))
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8">
+<title>Article {index}</title>
+<meta property="og:image" content="https://cdn.example.com/uploads/2024/{index}/hero.jpg">
+<meta name="twitter:image" content="https://cdn.example.com/uploads/2024/{index}/hero-twitter.jpg">
+<style>body {{ font-family: sans-serif; }} .menu-item {{ display: inline; }}</style>
+{scripts}
+</head><body>
+<header class="site-header"><img class="site-logo" src="https://cdn.example.com/logo.svg"><nav><ul>{nav}</ul></nav></header>
+<main><article class="post type-post">
+<h1 class="entry-title">Article {index} : {_sentence(rng, 8)}</h1>
+<div class="post-thumbnail"><img class="wp-post-image" src="https://cdn.example.com/uploads/2024/{index}/hero-1200x675.jpg"></div>
+<div class="entry-content">{body}
+<div class="cookie-notice">Ce contenu est bloqué car vous n'avez pas accepté les cookies. Gérer mes choix</div>
+</div></article>
+<aside class="sidebar">{sidebar}</aside></main>
+<footer class="site-footer"><img src="https://cdn.example.com/footer-banner.png"><p>© Exemple</p></footer>
+</body></html>"""
+
+def load_html_fixtures(count=10):
+    """Retourne les pages enregistrées, ou des pages générées à défaut"""
+    pages = []
+    if os.path.isdir(HTML_FIXTURES_DIR):
+        for name in sorted(os.listdir(HTML_FIXTURES_DIR)):
+            if name.endswith('.html'):
+                with open(os.path.join(HTML_FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+                    pages.append((name, f.read()))
+    if not pages:
+        pages = [(f'generated-{i}.html', generate_article_page(i)) for i in range(count)]
+    return pages
+
+def load_image_urls():
+    """Retourne le corpus d'URLs d'images (benchmarks/fixtures/image_urls.txt)"""
+    with open(IMAGE_URLS_FILE, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def generate_feed(base_url, feed_index, items=20, seed=0):
+    """Génère un flux RSS 2.0 dont les articles pointent vers base_url/articles/"""
+    rng = random.Random(seed + feed_index)
+    entries = []
+    for i in range(items):
+        title = _sentence(rng, 8).rstrip('.')
+        link = f"{base_url}/articles/{feed_index}-{i}.html"
+        entries.append(f"""<item><title>{title}</title><link>{link}</link><guid>{link}</guid>
+<description><![CDATA[<p>{_sentence(rng, 30)}</p>]]></description>
+<pubDate>Mon, {1 + i % 28:02d} Jan 2024 {i % 24:02d}:00:00 +0100</pubDate>
+<content:encoded><![CDATA[{''.join(f'<p>{_sentence(rng, 40)}</p>' for _ in range(10))}]]></content:encoded></item>""")
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>
+<title>Flux {feed_index}</title><link>{base_url}</link><description>Flux de test</description>
+{''.join(entries)}
+</channel></rss>"""
@@ -0,0 +1,245 @@
+"""Serveur local qui remplace les flux RSS, les sites d'articles, l'API OpenAI et l'API Notion
+
+Routes :
+    /feeds/<n>.xml                  flux RSS générés
+    /articles/<nom>.html            pages d'articles (enregistrées ou générées)
+    /openai/v1/chat/completions     réponse d'analyse JSON, avec latence et 429 configurables
+    /openai/v1/files, /batches      API Batch : le lot se termine après llm_latency secondes
+    /notion/v1/...                  schéma de la base, création et archivage de pages
+
+Le serveur tourne dans un processus séparé pour ne pas fausser les mesures (GIL, mémoire).
+"""
+import itertools
+import json
+import multiprocessing
+from email.parser import BytesParser
+from email.policy import HTTP
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import generate_feed, load_html_fixtures
+
+NOTION_PROPERTIES = ["Title", "URL", "Flux", "Date", "Contenu", "Commercial", "Score", "Résumé", "Tags", "Double"]
+
+ANALYSIS = {
+    "isDouble": False,
+    "similarArticle": None,
+    "similarityReason": None,
+    "isCommercial": False,
+    "significanceScore": 6.5,
+    "summary": "Résumé factuel de l'article de test.",
+    "tags": ["Technologie"],
+}
+
+class StandinConfig:
+    """Paramètres des serveurs de remplacement ; rate_limit_every=N renvoie un 429 pour une requête sur N"""
+
+    def __init__(self, items_per_feed=20, llm_latency=0.3, notion_latency=0.1, rate_limit_every=0, retry_after=1.0):
+        self.items_per_feed = items_per_feed
+        self.llm_latency = llm_latency
+        self.notion_latency = notion_latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+def chat_completion(request):
+    """Réponse de /chat/completions pour une requête (dictionnaire)"""
+    prompt_tokens = sum(len(message.get("content", "")) for message in request.get("messages", [])) // 4
+    return {
+        "id": "chatcmpl-" + uuid.uuid4().hex,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(ANALYSIS, ensure_ascii=False)}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 80, "total_tokens": prompt_tokens + 80},
+    }
+
+def multipart_file(body, content_type):
+    """Contenu du champ file d'un formulaire multipart (envoi de fichier OpenAI)"""
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body)
+    for part in message.iter_parts():
+        if part.get_param('name', header='content-disposition') == 'file':
+            return part.get_payload(decode=True)
+    return b''
+
+class BatchStore:
+    """Fichiers et lots de l'API Batch ; un lot est terminé latency secondes après sa création"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.files = {}
+        self.batches = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, content, filename, purpose):
+        file_id = "file-" + uuid.uuid4().hex
+        with self._lock:
+            self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create(self, request):
+        batch = {
+            "id": "batch_" + uuid.uuid4().hex,
+            "object": "batch",
+            "endpoint": request.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": request.get("input_file_id"),
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+        }
+        with self._lock:
+            self.batches[batch["id"]] = (batch, time.monotonic())
+        return batch
+
+    def retrieve(self, batch_id, cancel=False):
+        with self._lock:
+            if batch_id not in self.batches:
+                return None
+            batch, created = self.batches[batch_id]
+            if batch["status"] == "in_progress":
+                if cancel:
+                    batch["status"] = "cancelled"
+                elif time.monotonic() - created >= self.latency:
+                    batch["output_file_id"] = "file-" + uuid.uuid4().hex
+                    self.files[batch["output_file_id"]] = self._output(self.files.get(batch["input_file_id"], b''))
+                    batch["status"] = "completed"
+            return dict(batch)
+
+    @staticmethod
+    def _output(content):
+        lines = []
+        for line in content.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            lines.append(json.dumps({
+                "id": "batch_req_" + uuid.uuid4().hex,
+                "custom_id": request.get("custom_id"),
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_completion(request.get("body", {}))},
+                "error": None,
+            }, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode('utf-8')
+
+class RateLimitCounter:
+    def __init__(self, every):
+        self.every = every
+        self._count = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def should_limit(self):
+        if not self.every:
+            return False
+        with self._lock:
+            return next(self._count) % self.every == 0
+
+def make_handler(config, base_url_holder):
+    pages = [html.encode('utf-8') for _, html in load_html_fixtures()]
+    openai_limit = RateLimitCounter(config.rate_limit_every)
+    notion_limit = RateLimitCounter(config.rate_limit_every)
+    batches = BatchStore(config.llm_latency)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type='application/json', headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return self.rfile.read(length) if length else b''
+
+        def _rate_limited(self, counter, error):
+            if counter.should_limit():
+                self._send(429, error, headers={'Retry-After': f"{config.retry_after:g}"})
+                return True
+            return False
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path.startswith('/feeds/'):
+                index = int(path.rsplit('/', 1)[1].split('.')[0])
+                feed = generate_feed(base_url_holder[0], index, config.items_per_feed)
+                return self._send(200, feed.encode('utf-8'), 'application/rss+xml; charset=utf-8')
+            if path.startswith('/articles/'):
+                page = pages[sum(path.encode('utf-8')) % len(pages)]
+                return self._send(200, page, 'text/html; charset=utf-8')
+            if path.startswith('/openai/v1/batches/'):
+                batch = batches.retrieve(path.rsplit('/', 1)[1])
+                return self._send(200, batch) if batch else self._send(404, {"error": {"message": "No such batch"}})
+            if path.startswith('/openai/v1/files/') and path.endswith('/content'):
+                content = batches.files.get(path.split('/')[-2])
+                if content is None:
+                    return self._send(404, {"error": {"message": "No such file"}})
+                return self._send(200, content, 'application/octet-stream')
+            if path.startswith('/notion/v1/databases/'):
+                time.sleep(config.notion_latency)
+                return self._send(200, {"object": "database", "properties": {
+                    name: {"id": name.lower(), "name": name} for name in NOTION_PROPERTIES
+                }})
+            self._send(404, {"message": "not found"})
+
+        def do_POST(self):
+            path = self.path.split('?', 1)[0]
+            body = self._read_body()
+            if path == '/openai/v1/chat/completions':
+                if self._rate_limited(openai_limit, {"error": {"message": "Rate limit reached", "type": "requests"}}):
+                    return
+                time.sleep(config.llm_latency)
+                return self._send(200, chat_completion(json.loads(body or b'{}')))
+            if path == '/openai/v1/files':
+                content = multipart_file(body, self.headers.get('Content-Type', ''))
+                return self._send(200, batches.add_file(content, "analyses.jsonl", "batch"))
+            if path == '/openai/v1/batches':
+                return self._send(200, batches.create(json.loads(body or b'{}')))
+            if path.startswith('/openai/v1/batches/') and path.endswith('/cancel'):
+                batch = batches.retrieve(path.split('/')[-2], cancel=True)
+                return self._send(200, batch) if batch else self._send(404, {"error": {"message": "No such batch"}})
+            if path.startswith('/notion/v1/'):
+                if self._rate_limited(notion_limit, {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"}):
+                    return
+                time.sleep(config.notion_latency)
+                if path.endswith('/query'):
+                    return self._send(200, {"object": "list", "results": [], "has_more": False, "next_cursor": None})
+                return self._send(200, {"object": "page", "id": str(uuid.uuid4())})
+            self._send(404, {"message": "not found"})
+
+        def do_PATCH(self):
+            self._read_body()
+            if self.path.startswith('/notion/v1/pages/'):
+                if self._rate_limited(notion_limit, {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"}):
+                    return
+                time.sleep(config.notion_latency)
+                return self._send(200, {"object": "page", "archived": True})
+            self._send(404, {"message": "not found"})
+
+    return Handler
+
+def _serve(config, connection):
+    base_url_holder = [None]
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(config, base_url_holder))
+    server.daemon_threads = True
+    base_url_holder[0] = f"http://127.0.0.1:{server.server_address[1]}"
+    connection.send(base_url_holder[0])
+    server.serve_forever()
+
+def start_standins(config):
+    """Démarre le serveur dans un processus séparé, retourne (processus, URL de base)"""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(config, child), daemon=True)
+    process.start()
+    return process, parent.recv()
@@ -1,14 +1,19 @@
-from openai import OpenAI
+from openai import OpenAI, RateLimitError, APIStatusError, APIConnectionError, APITimeoutError
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import hashlib
 import json
 from datetime import datetime
-from article_tracker import clean_article_content  # Ajouter cet import
+from article_tracker import get_article_store, clean_analysis
+from text_normalizer import clean_article_content
+from similarity_index import get_similarity_index
 import logging
-import tiktoken
-
-load_dotenv()
+from prompt_builder import build_analysis_prompt, SYSTEM_PROMPT, PROMPT_VERSION
+from analysis_cache import get_analysis_cache, analysis_cache_key, normalize_for_hash
+from rate_limiter import RateLimiter, retry_after_seconds, backoff_delay
+from metrics import timed, increment, record_token_usage
 
 # Configuration du logging
 def setup_chatgpt_logger():
@@ -40,7 +45,16 @@ def setup_chatgpt_logger():
     
     return logger
 
-chatgpt_logger = setup_chatgpt_logger()
+_chatgpt_logger = None
+_chatgpt_logger_lock = threading.Lock()
+
+def get_chatgpt_logger():
+    """Logger des interactions, configuré au premier usage (ENABLE_CHATGPT_LOGS)"""
+    global _chatgpt_logger
+    with _chatgpt_logger_lock:
+        if _chatgpt_logger is None:
+            _chatgpt_logger = setup_chatgpt_logger()
+        return _chatgpt_logger
 
 def log_chatgpt_interaction(prompt, response):
     """Log l'interaction avec ChatGPT"""
@@ -55,6 +69,7 @@ RÉPONSE:
 
 {"="*50}
 """
+        chatgpt_logger = get_chatgpt_logger()
         chatgpt_logger.info(log_entry)
         # Force le flush du logger
         for handler in chatgpt_logger.handlers:
@@ -84,139 +99,302 @@ def clean_chatgpt_response(response):
             "category": "undefined"
         }
 
-def count_tokens(text, model="gpt-4"):
-    """Compte le nombre de tokens dans un texte"""
+def read_float_env(name, default):
     try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
-    except Exception as e:
-        print(f"Erreur lors du comptage des tokens: {e}")
-        return 0
+        return float(os.getenv(name, str(default)).split('#')[0].strip())
+    except ValueError:
+        return default
+
+def find_similar_articles(title, content):
+    """Recherche locale des articles déjà traités les plus proches (index TF-IDF)"""
+    top_k = int(read_float_env("SIMILARITY_TOP_K", 10))
+    min_score = read_float_env("SIMILARITY_MIN_SCORE", 0.1)
+    return get_similarity_index().query(title, content[:1500], top_k=top_k, min_score=min_score)
+
+def remember_analysed_article(url, title, content, analysis=None):
+    """Ajoute un article analysé, pas encore publié, à l'index des doublons
+
+    Avec le pipeline, l'article N attend encore l'étape Notion quand l'article N+1
+    est analysé : sans cela, la même information reprise par deux flux dans une
+    même exécution ne serait pas détectée. La publication remplace l'entrée.
+    """
+    get_similarity_index().article_added({
+        "url": url,
+        "title": title,
+        "content": content,
+        "analysis": clean_analysis(analysis)
+    })
+
+def apply_similarity_decision(result, candidates):
+    """Marque l'article comme doublon si l'index local est suffisamment confiant"""
+    threshold = read_float_env("SIMILARITY_DOUBLE_THRESHOLD", 0.8)
+    if not candidates or not isinstance(result, dict):
+        return result
+    score, _, similar_title = candidates[0]
+    if score >= threshold and not result.get("isDouble"):
+        print(f"Doublon détecté localement (similarité {score:.2f}): {similar_title}")
+        result["isDouble"] = True
+        result["similarArticle"] = similar_title
+        result["similarityReason"] = f"Similarité locale de {score:.2f} avec un article déjà traité"
+    return result
+
+ERROR_ANALYSIS = {
+    "isDouble": False,
+    "similarArticle": None,
+    "similarityReason": None,
+    "isCommercial": False,
+    "significanceScore": 5.0,
+    "summary": "Erreur lors de l'analyse",
+    "tags": []
+}
+
+_clients = {}
+_limiter = None
+_openai_lock = threading.Lock()
+
+def get_openai_client(api_key):
+    """Client OpenAI partagé (OPENAI_BASE_URL permet de viser un serveur local)
+
+    Les nouvelles tentatives du SDK sont désactivées : les 429 sont gérés par
+    create_chat_completion avec le limiteur commun.
+    """
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    with _openai_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _clients[(api_key, base_url)] = client
+        return client
+
+def get_openai_limiter():
+    """Limiteur requêtes/minute (OPENAI_RPM) et tokens/minute (OPENAI_TPM) du processus"""
+    global _limiter
+    with _openai_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=read_float_env("OPENAI_RPM", 500),
+                tokens_per_minute=read_float_env("OPENAI_TPM", 200000)
+            )
+        return _limiter
+
+def reset_openai_state():
+    """Oublie les clients, le limiteur et le logger (recréés avec la configuration courante)"""
+    global _limiter, _chatgpt_logger
+    with _openai_lock:
+        _clients.clear()
+        _limiter = None
+    with _chatgpt_logger_lock:
+        _chatgpt_logger = None
+
+def create_chat_completion(client, model, messages, estimated_tokens=0):
+    """Appel chat.completions avec limitation de débit et gestion des 429
+
+    Sur un 429, le délai indiqué par l'API (retry-after, x-ratelimit-reset-*)
+    est respecté par tous les workers ; sur une erreur serveur ou réseau, nouvelle
+    tentative avec un délai exponentiel. OPENAI_MAX_RETRIES tentatives au plus.
+    """
+    limiter = get_openai_limiter()
+    max_retries = int(read_float_env("OPENAI_MAX_RETRIES", 5))
+    for attempt in range(max_retries + 1):
+        limiter.acquire(estimated_tokens)
+        try:
+            response = client.chat.completions.create(model=model, messages=messages)
+            record_token_usage(getattr(response, "usage", None))
+            return response
+        except RateLimitError as e:
+            increment("openai_rate_limited")
+            if attempt == max_retries:
+                raise
+            delay = retry_after_seconds(e.response.headers) if e.response is not None else None
+            delay = delay if delay is not None else backoff_delay(attempt)
+            print(f"Limite OpenAI atteinte (429), nouvelle tentative dans {delay:.1f}s")
+            limiter.pause(delay)
+        except (APIConnectionError, APITimeoutError):
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+        except APIStatusError as e:
+            if e.status_code < 500 or attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+
+def prepare_analysis_request(title, content, model):
+    """Prépare les messages d'analyse d'un article
+
+    Retourne (messages, prompt, tokens, candidats similaires).
+    """
+    print("\nDébut préparation articles de comparaison...")
+    
+    # Seuls les articles déjà traités les plus proches sont envoyés à ChatGPT
+    candidates = find_similar_articles(title, content)
+    print(f"Articles similaires retenus : {len(candidates)} sur {len(get_article_store())}")
+    
+    # Prompt construit dans le respect des budgets de tokens par section
+    prompt, tokens = build_analysis_prompt(
+        title,
+        content,
+        [article_title for _, _, article_title in candidates],
+        model
+    )
+    print(f"\nTokens du prompt: {tokens['total']} (instructions {tokens['instructions']}, "
+          f"titre {tokens['title']}, contenu {tokens['body']}, comparaison {tokens['comparison']})")
+    
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    return messages, prompt, tokens, candidates
+
+def is_complete_analysis(result):
+    """Vérifie qu'une réponse contient une analyse exploitable (et peut être mise en cache)"""
+    return isinstance(result, dict) and "summary" in result and "significanceScore" in result
 
+def get_cache_key(title, content, model):
+    return analysis_cache_key(generate_topic_id(title, content), model, PROMPT_VERSION)
+
+def get_cached_analysis(title, content, cache_key):
+    """Retourne l'analyse en cache (JSON) avec une détection des doublons à jour, ou None"""
+    cached = get_analysis_cache().get(cache_key)
+    if cached is None:
+        return None
+    print("Analyse trouvée dans le cache, pas d'appel à ChatGPT")
+    # Les doublons dépendent de l'historique actuel, pas de celui du moment de l'analyse
+    result = apply_similarity_decision(cached, find_similar_articles(title, content))
+    return json.dumps(result)
+
+def finalize_analysis(response_content, prompt, tokens, candidates, cache_key=None):
+    """Nettoie la réponse de ChatGPT, la met en cache et la retourne en JSON"""
+    result = clean_chatgpt_response(response_content)
+    if cache_key and is_complete_analysis(result):
+        get_analysis_cache().put(cache_key, dict(result))
+    result = apply_similarity_decision(result, candidates)
+    
+    # Log de la réponse avec le nombre de tokens
+    log_entry = f"Tokens utilisés: {tokens}\n\n"
+    log_chatgpt_interaction(log_entry + prompt, json.dumps(result, indent=2, ensure_ascii=False))
+    
+    print(f"\nRésultat ChatGPT:")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return json.dumps(result)
+
+@timed("process_with_chatgpt")
 def process_with_chatgpt(title, content, api_key, articles_data=None):
+    prompt = None
     try:
-        client = OpenAI(api_key=api_key)
         model = os.getenv("OPENAI_MODEL", "gpt-4")
         
-        print("\nDébut préparation articles de comparaison...")
-        
-        # Charger directement depuis le fichier processed_articles.json
-        try:
-            with open("processed_articles.json", 'r', encoding='utf-8') as f:
-                processed_data = json.load(f)
-                articles = processed_data.get("articles", [])
-                print(f"Nombre total d'articles trouvés dans processed_articles.json : {len(articles)}")
-        except FileNotFoundError:
-            articles = []
-            print("Fichier processed_articles.json non trouvé")
-        except json.JSONDecodeError:
-            articles = []
-            print("Erreur de lecture du fichier processed_articles.json")
+        # Même contenu déjà analysé (échec Notion précédent, article repris par deux flux...)
+        cache_key = get_cache_key(title, content, model)
+        cached_analysis = get_cached_analysis(title, content, cache_key)
+        if cached_analysis is not None:
+            increment("analysis_cache_hits")
+            return cached_analysis
         
-        # Construire le texte de comparaison
-        comparison_text = ""
-        if articles:
-            comparison_text = "\n=== Articles précédents ===\n"
-            for i, article in enumerate(articles, 1):
-                article_title = article.get('title', 'Sans titre')
-                comparison_text += f"{i}. {article_title}\n"
-        
-        #print(comparison_text)
-
-        prompt = f"""
-        Tu es un assistant spécialisé dans l'analyse d'articles d'actualité. 
-        Tu réponds uniquement au format JSON demandé.
-
-        === Article à analyser ===
-        TITRE: {title}
-        CONTENU: {content[:1500]}
-
-        {comparison_text}
-
-        === Critères d'analyse ===
-        1. SIMILARITÉ
-        - Vérifier si l'article est similaire à un des articles récents listés
-        - Un article est considéré comme similaire s'il traite du même sujet principal
-        - Prendre en compte le titre et le contenu
-
-        2. CONTENU COMMERCIAL
-        - Mots promotionnels: "promo", "promotion", "offre", "soldes", "réduction"
-        - Symboles monétaires et pourcentages
-        - Mentions commerciales
-        - Références temporelles
-        - VPN et abonnements
-
-        3. IMPORTANCE DE L'ARTICLE (0.0 à 10.0)
-        4. RÉSUMÉ (factuel, très détaillés et précis)
-        5. TAG principal (1 tag en français, commençant par une majuscule)
-
-        Répondre EXACTEMENT dans ce format JSON:
-        {{
-          "isDouble": true/false,
-          "similarArticle": "titre de l'article similaire ou null",
-          "similarityReason": "explication courte de la similarité ou null",
-          "isCommercial": true/false,
-          "significanceScore": <nombre entre 0.0 et 10.0>,
-          "summary": "<résumé en français>",
-          "tags": ["tag1"]
-        }}
-        """
-        
-        # Compter les tokens du prompt
-        token_count = count_tokens(prompt, model)
-        print(f"\nNombre de tokens utilisés pour ce prompt: {token_count}")
+        client = get_openai_client(api_key)
+        messages, prompt, tokens, candidates = prepare_analysis_request(title, content, model)
         
         print("\nPrompt préparé, envoi à ChatGPT...")
         
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "Tu es un assistant spécialisé dans l'analyse d'articles d'actualité."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        result = clean_chatgpt_response(response.choices[0].message.content)
-        
-        # Log de la réponse avec le nombre de tokens
-        log_entry = f"Tokens utilisés: {token_count}\n\n"
-        log_chatgpt_interaction(log_entry + prompt, json.dumps(result, indent=2, ensure_ascii=False))
-        
-        print(f"\nRésultat ChatGPT:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-        return json.dumps(result)
+        response = create_chat_completion(client, model, messages, tokens['total'])
+        return finalize_analysis(response.choices[0].message.content, prompt, tokens, candidates, cache_key)
         
     except Exception as e:
         # Log de l'erreur
         log_chatgpt_interaction(prompt, f"ERREUR: {str(e)}")
+        increment("analysis_errors")
         print(f"Erreur lors du traitement ChatGPT: {e}")
-        return json.dumps({
-            "isDouble": False,
-            "similarArticle": null,
-            "similarityReason": null,
-            "isCommercial": false,
-            "significanceScore": 5.0,
-            "summary": "Erreur lors de l'analyse",
-            "tags": []
-        })
+        return json.dumps(ERROR_ANALYSIS)
 
-def generate_topic_id(title, content):
-    """Génère un identifiant unique pour le sujet principal de l'article"""
-    text = f"{title} {content}"
-    return hashlib.md5(text.encode()).hexdigest()
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
 
-def load_processed_articles(filepath):
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"articles": []}
+def process_batch_with_chatgpt(articles, api_key, poll_interval=30, max_wait=24 * 3600):
+    """Analyse un lot d'articles via l'API Batch d'OpenAI (mode hors ligne, pour les rattrapages)
+
+    articles est une liste de (URL, titre, contenu). Les requêtes sont
+    envoyées dans un seul fichier JSONL, puis le lot est interrogé toutes les
+    poll_interval secondes jusqu'à sa fin. Retourne {URL: analyse JSON} ;
+    les articles en échec reçoivent l'analyse d'erreur par défaut.
+    """
+    if not articles:
+        return {}
+    client = get_openai_client(api_key)
+    model = os.getenv("OPENAI_MODEL", "gpt-4")
+
+    analyses = {}
+    prepared = {}
+    lines = []
+    for index, (article_id, title, content) in enumerate(articles):
+        cache_key = get_cache_key(title, content, model)
+        cached_analysis = get_cached_analysis(title, content, cache_key)
+        if cached_analysis is not None:
+            increment("analysis_cache_hits")
+            analyses[article_id] = cached_analysis
+            remember_analysed_article(article_id, title, content, cached_analysis)
+            continue
+        custom_id = f"article-{index}"
+        messages, prompt, tokens, candidates = prepare_analysis_request(title, content, model)
+        # Les articles suivants du lot sont comparés à celui-ci
+        remember_analysed_article(article_id, title, content)
+        prepared[custom_id] = (article_id, prompt, tokens, candidates, cache_key)
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": messages}
+        }, ensure_ascii=False))
 
-def save_processed_articles(articles, filepath):
-    with open(filepath, 'w') as f:
-        json.dump(articles, f, indent=2)
+    if not lines:
+        return analyses
+
+    batch_input = client.files.create(
+        file=("analyses.jsonl", ("\n".join(lines) + "\n").encode("utf-8")),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"Lot OpenAI créé: {batch.id} ({len(lines)} articles)")
+
+    deadline = time.time() + max_wait
+    while batch.status not in BATCH_FINAL_STATUSES:
+        if time.time() > deadline:
+            print(f"Lot {batch.id} non terminé après {max_wait}s, annulation")
+            client.batches.cancel(batch.id)
+            break
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        print(f"Lot {batch.id}: {batch.status}")
+
+    for article_id, _, _, _, _ in prepared.values():
+        analyses[article_id] = json.dumps(ERROR_ANALYSIS)
+    if not getattr(batch, "output_file_id", None):
+        print(f"Lot {batch.id} terminé sans résultat (statut {batch.status})")
+        return analyses
+
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get("custom_id") not in prepared:
+            continue
+        article_id, prompt, tokens, candidates, cache_key = prepared[record["custom_id"]]
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            print(f"Erreur d'analyse dans le lot pour {article_id}: {record.get('error') or response.get('status_code')}")
+            continue
+        record_token_usage(response["body"].get("usage"), mode="batch")
+        content = response["body"]["choices"][0]["message"]["content"]
+        analyses[article_id] = finalize_analysis(content, prompt, tokens, candidates, cache_key)
+    return analyses
+
+def generate_topic_id(title, content):
+    """Génère un identifiant unique pour le sujet principal de l'article (titre + contenu normalisés)"""
+    text = f"{normalize_for_hash(title)} {normalize_for_hash(content)}"
+    return hashlib.md5(text.encode()).hexdigest()
 
-def process_article(url, title, content, api_key, articles_data):
+def process_article(url, title, content, api_key, articles_data=None):
     # Nettoyer le contenu avant traitement
     clean_title = clean_article_content(title)
     clean_content = clean_article_content(content)
@@ -241,17 +419,14 @@ def process_article(url, title, content, api_key, articles_data):
 
 # Exemple d'utilisation
 if __name__ == "__main__":
+    load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
-    filepath = "processed_articles.json"
     
     # Exemple d'utilisation
-    articles_data = load_processed_articles(filepath)
     new_article = process_article(
         "https://example.com/article",
         "Titre test",
         "Contenu test",
-        api_key,
-        articles_data
+        api_key
     )
-    articles_data["articles"].append(new_article)
-    save_processed_articles(articles_data, filepath)
+    get_article_store().add(new_article)
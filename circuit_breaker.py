@@ -0,0 +1,64 @@
+import threading
+import time
+
+class CircuitBreaker:
+    """Disjoncteur : coupe les appels après plusieurs échecs consécutifs
+
+    Après failure_threshold échecs consécutifs, le disjoncteur s'ouvre et
+    allow_request() retourne False pendant cooldown secondes. Ensuite une seule
+    requête d'essai est autorisée : un succès le referme, un échec le rouvre.
+    """
+
+    def __init__(self, name, failure_threshold=5, cooldown=120):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow_request(self):
+        """Indique si une requête peut être envoyée
+
+        Retourne False si le disjoncteur est ouvert, True s'il est fermé et,
+        en demi-ouvert, un jeton (vrai) pour la seule requête d'essai, à rendre
+        avec end_trial() une fois la requête terminée.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial is not None:
+                return False
+            # Demi-ouvert : une requête d'essai
+            self._trial = object()
+            return self._trial
+
+    def end_trial(self, permission):
+        """Termine l'essai obtenu par allow_request() s'il est resté sans résultat
+        (exception avant l'envoi...) pour en autoriser un autre ; sans effet pour
+        une autre valeur que le jeton de l'essai en cours"""
+        with self._lock:
+            if permission is self._trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"Disjoncteur {self.name} refermé")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+                print(f"Disjoncteur {self.name} ouvert après {self._failures} échecs, pause de {self.cooldown}s")
+                self._opened_at = time.monotonic()
+            self._trial = None
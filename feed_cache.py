@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_FILE = 'feed_cache.json'
+
+def content_hash(body):
+    """Calcule l'empreinte SHA-256 du contenu brut d'un flux"""
+    return hashlib.sha256(body).hexdigest()
+
+class FeedCache:
+    """Cache persistant des flux RSS (ETag, Last-Modified, empreinte du contenu et entrées parsées)"""
+
+    def __init__(self, file_path=FEED_CACHE_FILE, ttl=300):
+        self.file_path = file_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._feeds = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("feeds", {}) if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Cache des flux illisible, il sera reconstruit: {str(e)}")
+            return {}
+
+    def get(self, url):
+        """Retourne l'entrée de cache d'un flux ou None"""
+        with self._lock:
+            return self._feeds.get(url)
+
+    def is_fresh(self, cached):
+        """Indique si l'entrée de cache est encore dans sa durée de validité"""
+        return bool(cached) and time.time() - cached.get("fetched_at", 0) < self.ttl
+
+    def conditional_headers(self, cached):
+        """Construit les en-têtes de requête conditionnelle pour un flux"""
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def touch(self, url, etag=None, last_modified=None):
+        """Prolonge la validité d'un flux inchangé"""
+        with self._lock:
+            cached = self._feeds.get(url)
+            if cached is None:
+                return
+            cached["fetched_at"] = time.time()
+            if etag:
+                cached["etag"] = etag
+            if last_modified:
+                cached["last_modified"] = last_modified
+            self._dirty = True
+
+    def update(self, url, entries, body_hash, etag=None, last_modified=None, complete=True):
+        """Enregistre la nouvelle version d'un flux (complete=False si seul le début a été lu)"""
+        with self._lock:
+            self._feeds[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": body_hash,
+                "fetched_at": time.time(),
+                "entries": entries,
+                "complete": complete
+            }
+            self._dirty = True
+
+    def save(self):
+        """Sauvegarde le cache sur disque si nécessaire"""
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.file_path, {"feeds": self._feeds}, ensure_ascii=False)
+            self._dirty = False
+
+_feed_cache = None
+_feed_cache_lock = threading.Lock()
+
+def get_feed_cache(ttl=None):
+    """Retourne le cache des flux partagé par le processus"""
+    global _feed_cache
+    with _feed_cache_lock:
+        if _feed_cache is None:
+            _feed_cache = FeedCache()
+        if ttl is not None:
+            _feed_cache.ttl = ttl
+        return _feed_cache
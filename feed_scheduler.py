@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from datetime import datetime
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+FEED_SCHEDULE_FILE = 'feed_schedule.json'
+# Dates de publication conservées par flux pour estimer son rythme
+MAX_HISTORY = 30
+# Fraction de l'écart médian entre deux publications utilisée comme intervalle de relève
+POLL_FRACTION = 0.5
+# Un flux est relevé s'il est dû dans moins de POLL_TOLERANCE secondes, pour qu'une
+# exécution planifiée quelques secondes trop tôt ne le repousse pas d'un cycle entier
+POLL_TOLERANCE = 60
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+class FeedScheduler:
+    """Intervalle de relève propre à chaque flux, appris des dates de publication
+
+    L'intervalle vaut la moitié de l'écart médian entre les dernières publications,
+    borné par min_interval et max_interval. Chaque relève sans nouvel article le
+    multiplie par backoff (jusqu'à max_interval) ; un nouvel article le ramène au
+    rythme appris. Un flux inconnu est toujours dû.
+    """
+
+    def __init__(self, file_path=FEED_SCHEDULE_FILE, min_interval=300, max_interval=7200, backoff=1.5):
+        self.file_path = file_path
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._feeds = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("feeds", {}) if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Planning des flux illisible, il sera reconstruit: {str(e)}")
+            return {}
+
+    def is_due(self, url, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._feeds.get(url)
+            return state is None or state.get("next_poll", 0) <= now + POLL_TOLERANCE
+
+    def due_feeds(self, feeds, now=None):
+        """Flux de la liste à relever maintenant"""
+        now = time.time() if now is None else now
+        return [feed for feed in feeds if self.is_due(feed["url"], now)]
+
+    def next_poll(self, feeds):
+        """Date (timestamp) de la prochaine relève due parmi les flux, 0 si l'un est inconnu"""
+        with self._lock:
+            return min((self._feeds.get(feed["url"], {}).get("next_poll", 0) for feed in feeds), default=0)
+
+    def learned_interval(self, published):
+        """Intervalle de relève déduit des dates de publication (ISO 8601)"""
+        dates = sorted(date for date in map(_parse_date, published) if date is not None)
+        gaps = [(newer - older).total_seconds() for older, newer in zip(dates, dates[1:])]
+        gaps = [gap for gap in gaps if gap > 0]
+        if not gaps:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, statistics.median(gaps) * POLL_FRACTION))
+
+    def record_poll(self, url, entries, new_count, now=None):
+        """Met à jour le rythme d'un flux après une relève et planifie la suivante
+
+        entries sont les entrées lues (avec published_date), new_count le nombre
+        d'articles qui n'avaient pas encore été traités.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._feeds.setdefault(url, {"published": [], "empty_polls": 0})
+            published = set(state.get("published", []))
+            published.update(entry["published_date"] for entry in entries if entry.get("published_date"))
+            state["published"] = sorted(published)[-MAX_HISTORY:]
+
+            learned = self.learned_interval(state["published"])
+            state["empty_polls"] = 0 if new_count else state.get("empty_polls", 0) + 1
+            interval = min(self.max_interval, learned * self.backoff ** state["empty_polls"])
+            state["interval"] = round(interval)
+            state["last_poll"] = now
+            state["next_poll"] = now + interval
+            self._dirty = True
+            return interval
+
+    def record_failure(self, url, now=None):
+        """Planifie un nouvel essai après min_interval pour un flux dont la relève a
+        échoué, sans toucher à son rythme appris ni à son backoff"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._feeds.setdefault(url, {"published": [], "empty_polls": 0})
+            state["next_poll"] = now + self.min_interval
+            self._dirty = True
+            return self.min_interval
+
+    def save(self):
+        """Sauvegarde le planning sur disque si nécessaire"""
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.file_path, {"feeds": self._feeds}, ensure_ascii=False, indent=2)
+            self._dirty = False
+
+_feed_scheduler = None
+_feed_scheduler_lock = threading.Lock()
+
+def get_feed_scheduler():
+    """Retourne le planning des flux partagé (FEED_POLL_MIN_SECONDS, FEED_POLL_MAX_SECONDS, FEED_POLL_BACKOFF)"""
+    global _feed_scheduler
+    with _feed_scheduler_lock:
+        if _feed_scheduler is None:
+            try:
+                min_interval = float(os.getenv("FEED_POLL_MIN_SECONDS", "300").split('#')[0].strip())
+                max_interval = float(os.getenv("FEED_POLL_MAX_SECONDS", "7200").split('#')[0].strip())
+                backoff = float(os.getenv("FEED_POLL_BACKOFF", "1.5").split('#')[0].strip())
+            except ValueError:
+                min_interval, max_interval, backoff = 300, 7200, 1.5
+            _feed_scheduler = FeedScheduler(min_interval=min_interval, max_interval=max_interval, backoff=backoff)
+        return _feed_scheduler
+
+def reset_feed_scheduler():
+    """Sauvegarde puis oublie le planning partagé (recréé avec la configuration courante)"""
+    global _feed_scheduler
+    with _feed_scheduler_lock:
+        if _feed_scheduler is not None:
+            _feed_scheduler.save()
+        _feed_scheduler = None
@@ -0,0 +1,45 @@
+import logging
+from io import BytesIO
+import feedparser
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:  # rss_reader parse alors le flux entier avec feedparser
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ATOM_ENTRY = '{http://www.w3.org/2005/Atom}entry'
+RSS1_ITEM = '{http://purl.org/rss/1.0/}item'
+
+# Document minimal autour d'un élément isolé, pour que feedparser l'interprète comme dans le flux complet
+ENTRY_WRAPPERS = {
+    'item': (b'<rss version="2.0"><channel>', b'</channel></rss>'),
+    RSS1_ITEM: (b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">', b'</rdf:RDF>'),
+    ATOM_ENTRY: (b'<feed xmlns="http://www.w3.org/2005/Atom">', b'</feed>'),
+}
+
+def iter_feed_entries(body, url, content_type='application/xml'):
+    """Itère sur les entrées feedparser d'un flux, une à une, sans parser le reste du document
+
+    Le flux est lu avec lxml.etree.iterparse : chaque <item>/<entry> est parsé
+    par feedparser dès qu'il est complet, puis libéré. Arrêter l'itération évite
+    de parser les entrées suivantes. Lève etree.XMLSyntaxError si le flux n'est
+    pas du XML bien formé (feedparser, plus tolérant, doit alors être utilisé).
+    """
+    headers = {'content-location': url, 'content-type': content_type}
+    for _, element in etree.iterparse(BytesIO(body), events=('end',), tag=tuple(ENTRY_WRAPPERS),
+                                      resolve_entities=False, no_network=True):
+        prefix, suffix = ENTRY_WRAPPERS[element.tag]
+        parsed = feedparser.parse(prefix + etree.tostring(element) + suffix, response_headers=headers)
+
+        # Libérer l'élément et ses prédécesseurs : la mémoire reste proportionnelle à une entrée
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+        for entry in parsed.entries:
+            yield entry
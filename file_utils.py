@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+
+def _atomic_write(file_path, mode, write, **open_kwargs):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(file_path, data, **dump_kwargs):
+    """Écrit un fichier JSON de manière atomique (fichier temporaire puis renommage)"""
+    _atomic_write(file_path, 'w', lambda f: json.dump(data, f, **dump_kwargs), encoding='utf-8')
+
+def atomic_write_bytes(file_path, data):
+    """Écrit un fichier binaire de manière atomique"""
+    _atomic_write(file_path, 'wb', lambda f: f.write(data))
+
+def atomic_write_text(file_path, text):
+    """Écrit un fichier texte de manière atomique"""
+    _atomic_write(file_path, 'w', lambda f: f.write(text), encoding='utf-8')
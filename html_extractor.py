@@ -0,0 +1,204 @@
+import logging
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:  # Le scraper retombe alors sur BeautifulSoup
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Règles d'image, par ordre de priorité (équivalent des sélecteurs CSS de scraper.py)
+# ('meta', attribut, valeur)   -> meta[attribut="valeur"], on lit content
+# ('container', classe)        -> .classe img
+# ('container_tag', balise)    -> balise img
+# ('img_class', classe)        -> img.classe
+IMAGE_RULES = [
+    ('meta', 'property', 'og:image'),
+    ('meta', 'name', 'twitter:image'),
+    ('container', 'article-featured-image'),
+    ('container', 'post-thumbnail'),
+    ('container_tag', 'article'),
+    ('container', 'entry-content'),
+    ('img_class', 'wp-post-image'),
+    ('container_tag', 'figure'),
+    ('container', 'main-image'),
+    ('container', 'featured-image'),
+]
+
+# Conteneurs du contenu principal, par ordre de priorité
+# ('tag', balise), ('class', classe) ou ('itemprop', valeur)
+CONTENT_RULES = [
+    ('tag', 'article'),
+    ('class', 'article-content'),
+    ('class', 'post-content'),
+    ('itemprop', 'articleBody'),
+    ('class', 'entry-content'),
+]
+
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+def _compile_rules():
+    """Précompile les règles en tables de correspondance pour un seul parcours"""
+    meta_rules = {}
+    container_classes = {}
+    container_tags = {}
+    img_classes = {}
+    for priority, rule in enumerate(IMAGE_RULES):
+        if rule[0] == 'meta':
+            meta_rules[(rule[1], rule[2])] = priority
+        elif rule[0] == 'container':
+            container_classes[rule[1]] = priority
+        elif rule[0] == 'container_tag':
+            container_tags[rule[1]] = priority
+        elif rule[0] == 'img_class':
+            img_classes[rule[1]] = priority
+
+    content_tags = {}
+    content_classes = {}
+    content_itemprops = {}
+    for priority, rule in enumerate(CONTENT_RULES):
+        if rule[0] == 'tag':
+            content_tags[rule[1]] = priority
+        elif rule[0] == 'class':
+            content_classes[rule[1]] = priority
+        elif rule[0] == 'itemprop':
+            content_itemprops[rule[1]] = priority
+
+    return (meta_rules, container_classes, container_tags, img_classes,
+            content_tags, content_classes, content_itemprops)
+
+(_META_RULES, _CONTAINER_CLASSES, _CONTAINER_TAGS, _IMG_CLASSES,
+ _CONTENT_TAGS, _CONTENT_CLASSES, _CONTENT_ITEMPROPS) = _compile_rules()
+
+if LXML_AVAILABLE:
+    _FIRST_IMG = etree.XPath('(.//img)[1]')
+    _DEVELOPPEZ_IMAGES = etree.XPath('//div[contains(@style, "text-align: center")]//img[contains(@src, "/public/images/")]')
+
+def _first_rule_match(matches):
+    """Retourne la valeur non vide de la règle la plus prioritaire trouvée"""
+    for priority in sorted(matches):
+        if matches[priority] is not None:
+            return matches[priority]
+    return None
+
+def element_text(element):
+    """Texte d'un élément, équivalent de get_text(separator=' ', strip=True)"""
+    return ' '.join(text.strip() for text in element.itertext() if text.strip())
+
+def parse_html(html):
+    """Parse une page HTML avec lxml (retourne None si la page est vide ou illisible)"""
+    if not LXML_AVAILABLE or not html:
+        return None
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.error(f"Erreur de parsing HTML: {str(e)}")
+        return None
+    # Le texte des scripts et styles ne fait pas partie du contenu
+    etree.strip_elements(root, *NON_TEXT_TAGS, with_tail=False)
+    return root
+
+def extract_from_tree(root, url, is_valid_image_url, want_content=True):
+    """Trouve l'image principale et le conteneur de contenu en un seul parcours de l'arbre
+
+    Retourne (élément de contenu ou None, URL d'image ou None).
+    """
+    # Cas particulier developpez.com : images du contenu en priorité
+    if 'developpez.com' in url:
+        for img in _DEVELOPPEZ_IMAGES(root):
+            image_url = img.get('src')
+            if image_url and is_valid_image_url(image_url):
+                logger.info(f"Found developpez.com content image: {image_url}")
+                return (_find_content(root) if want_content else None), image_url
+
+    image_matches = {}
+    content_matches = {}
+    fallback_image = None
+
+    for element in root.iter(tag=etree.Element):
+        tag = element.tag
+        class_attr = element.get('class')
+        classes = class_attr.split() if class_attr else ()
+
+        if tag == 'meta':
+            for attribute in ('property', 'name'):
+                priority = _META_RULES.get((attribute, element.get(attribute)))
+                if priority is not None and priority not in image_matches:
+                    image_matches[priority] = element.get('content') or None
+        elif tag == 'img':
+            for class_name in classes:
+                priority = _IMG_CLASSES.get(class_name)
+                if priority is not None and priority not in image_matches:
+                    image_matches[priority] = element.get('src') or None
+            if fallback_image is None:
+                src = element.get('src')
+                if src and is_valid_image_url(src):
+                    fallback_image = src
+
+        # Conteneurs d'image : premier <img> descendant du premier conteneur qui en a un
+        priority = _CONTAINER_TAGS.get(tag)
+        if priority is not None and priority not in image_matches:
+            img = _FIRST_IMG(element)
+            if img:
+                image_matches[priority] = img[0].get('src') or None
+        for class_name in classes:
+            priority = _CONTAINER_CLASSES.get(class_name)
+            if priority is not None and priority not in image_matches:
+                img = _FIRST_IMG(element)
+                if img:
+                    image_matches[priority] = img[0].get('src') or None
+
+        if want_content:
+            priority = _CONTENT_TAGS.get(tag)
+            if priority is not None and priority not in content_matches:
+                content_matches[priority] = element
+            for class_name in classes:
+                priority = _CONTENT_CLASSES.get(class_name)
+                if priority is not None and priority not in content_matches:
+                    content_matches[priority] = element
+            itemprop = element.get('itemprop')
+            if itemprop is not None:
+                priority = _CONTENT_ITEMPROPS.get(itemprop)
+                if priority is not None and priority not in content_matches:
+                    content_matches[priority] = element
+
+        # Arrêt anticipé : les règles les plus prioritaires sont satisfaites
+        if image_matches.get(0) and (not want_content or 0 in content_matches):
+            break
+
+    # Comme select_one : seul le premier élément de chaque règle compte, et une
+    # règle dont l'élément n'a pas d'URL est ignorée
+    image_url = _first_rule_match(image_matches) or fallback_image
+    content_element = _first_rule_match(content_matches) if want_content else None
+    return content_element, image_url
+
+def _find_content(root):
+    content_element, _ = extract_from_tree(root, '', lambda image_url: False)
+    return content_element
+
+def extract_article(html, url, is_valid_image_url, clean_content):
+    """Extrait (contenu, image_url) d'une page HTML avec un seul parsing lxml
+
+    clean_content est appliqué au texte extrait. Retourne None si lxml n'est
+    pas disponible ou si la page ne peut pas être parsée.
+    """
+    root = parse_html(html)
+    if root is None:
+        return None
+    content_element, image_url = extract_from_tree(root, url, is_valid_image_url)
+    if content_element is not None:
+        content = clean_content(element_text(content_element))
+    else:
+        content = None
+    if not content:
+        content = clean_content(element_text(root))
+    return content, image_url
+
+def extract_image(html, url, is_valid_image_url):
+    """Extrait uniquement l'image principale d'une page HTML"""
+    root = parse_html(html)
+    if root is None:
+        return None
+    return extract_from_tree(root, url, is_valid_image_url, want_content=False)[1]
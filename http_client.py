@@ -0,0 +1,92 @@
+import os
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+def _supported_encodings():
+    """Encodages de compression que urllib3 sait décoder avec les paquets installés"""
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+def _read_float_env(name, default):
+    try:
+        return float(os.getenv(name, str(default)).split('#')[0].strip())
+    except ValueError:
+        return default
+
+class PooledSession(requests.Session):
+    """Session requests avec timeout par défaut"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+def create_session():
+    """Crée une session HTTP avec pools de connexions keep-alive par hôte
+
+    Configuration via le .env : HTTP_TIMEOUT (secondes), HTTP_POOL_MAXSIZE
+    (connexions conservées par hôte) et HTTP_POOL_HOSTS (nombre d'hôtes gardés
+    en pool).
+    """
+    session = PooledSession(timeout=_read_float_env("HTTP_TIMEOUT", 15))
+    adapter = HTTPAdapter(
+        pool_connections=int(_read_float_env("HTTP_POOL_HOSTS", 50)),
+        pool_maxsize=int(_read_float_env("HTTP_POOL_MAXSIZE", 20)),
+        # Nouvelle tentative uniquement sur les erreurs de connexion (pas d'envoi en double)
+        max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': _supported_encodings(),
+        'Connection': 'keep-alive'
+    })
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Retourne la session HTTP partagée par tout le processus"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+def reset_session():
+    """Ferme la session partagée (elle sera recréée avec la configuration courante)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+def http_get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+def http_post(url, **kwargs):
+    return get_session().post(url, **kwargs)
+
+def http_patch(url, **kwargs):
+    return get_session().patch(url, **kwargs)
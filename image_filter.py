@@ -0,0 +1,75 @@
+# Motifs d'URL qui désignent des logos, icônes et éléments de mise en page
+EXCLUDED_PATTERNS = [
+    'logo',  # couvre aussi logos, site-logo
+    'favicon',
+    'fzn',
+    'header',
+    'footer',
+    'icon',  # couvre aussi site-icon
+    'banner',
+    '-min.png',  # Format courant pour les logos minifiés
+    'brand',
+]
+# Exclusions propres aux images des flux (insensibles à la casse) : tailles d'icônes et extensions de logos
+EXCLUDED_SIZES = ['16x16', '32x32', '64x64']
+EXCLUDED_EXTENSIONS = ['.ico', '.svg']
+
+# Règles par domaine des images trouvées sur les pages, appliquées avant les motifs
+# généraux : une URL qui contient un motif "allow" est acceptée, un motif "deny" refusée
+DOMAIN_RULES = {
+    'developpez.com': {
+        'allow': ['/public/images/'],
+        'deny': ['/images/logos/'],
+    },
+}
+
+# Tables précalculées. Des tests `in` successifs restent plus rapides qu'une
+# alternance regex en CPython (voir benchmarks/bench_image_filter.py)
+_PAGE_EXCLUDED = tuple(EXCLUDED_PATTERNS)
+_FEED_EXCLUDED = tuple(pattern.lower() for pattern in EXCLUDED_PATTERNS + EXCLUDED_SIZES)
+_EXCLUDED_EXTENSIONS = tuple(EXCLUDED_EXTENSIONS)
+_DOMAIN_RULES = tuple(
+    (domain, tuple(rules.get('allow', ())), tuple(rules.get('deny', ())))
+    for domain, rules in DOMAIN_RULES.items()
+)
+
+def is_valid_image_url(url):
+    """Vérifie si l'URL d'une image de flux (enclosure, média, contenu) n'est pas un logo
+
+    Les motifs sont cherchés sans tenir compte de la casse.
+    """
+    if not url:
+        return False
+    url = url.lower()
+    for pattern in _FEED_EXCLUDED:
+        if pattern in url:
+            return False
+    return not url.endswith(_EXCLUDED_EXTENSIONS)
+
+def is_valid_page_image_url(url):
+    """Vérifie si l'URL d'une image trouvée sur la page d'un article n'est pas un logo
+
+    Les règles par domaine passent en premier ; les motifs sont sensibles à la
+    casse, pour garder les photos dont le nom de fichier contient HEADER, Brand...
+    """
+    if not url:
+        return False
+    for domain, allow, deny in _DOMAIN_RULES:
+        if domain in url:
+            for pattern in allow:
+                if pattern in url:
+                    return True
+            for pattern in deny:
+                if pattern in url:
+                    return False
+    for pattern in _PAGE_EXCLUDED:
+        if pattern in url:
+            return False
+    return True
+
+def first_valid_image(urls, is_valid=is_valid_image_url):
+    """Première URL d'image valide d'une liste de candidates, ou None"""
+    for url in urls:
+        if is_valid(url):
+            return url
+    return None
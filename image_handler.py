@@ -1,31 +1,23 @@
 import os
-import requests
+from http_client import http_post
 import logging
 from urllib.parse import urlparse
-from dotenv import load_dotenv
 import base64
 from io import BytesIO
+from image_store import get_image_store
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
-IMGUR_CLIENT_ID = os.getenv('IMGUR_CLIENT_ID')
-IMGUR_CLIENT_SECRET = os.getenv('IMGUR_CLIENT_SECRET')
-
 def download_image(url):
     """Télécharge l'image depuis l'URL"""
     try:
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
             'Accept-Language': 'fr,fr-FR;q=0.9,en;q=0.8',
             'Referer': 'https://www.jeuxvideo.com/'
         }
         
-        logger.info(f"Downloading image with headers from: {url}")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.content
+        return get_image_store().fetch(url, headers=headers)
     except Exception as e:
         logger.error(f"Erreur lors du téléchargement de l'image: {str(e)}")
         return None
@@ -38,20 +30,27 @@ def upload_to_imgur(image_url):
             logger.error("IMGUR_CLIENT_ID not found in environment variables")
             return None
 
-        # Get the image first
-        img_response = requests.get(image_url)
-        if img_response.status_code != 200:
-            logger.error(f"Failed to fetch image from {image_url}")
+        # Get the image first (cached: the same image is only uploaded once)
+        store = get_image_store()
+        try:
+            imgur_url = store.get_upload(image_url)
+            image_data = store.fetch(image_url)
+        except Exception as e:
+            logger.error(f"Failed to fetch image from {image_url}: {str(e)}")
             return None
+        if imgur_url:
+            logger.info(f"Image already uploaded to Imgur: {imgur_url}")
+            return imgur_url
 
         # Upload to Imgur
         headers = {'Authorization': f'Client-ID {client_id}'}
-        files = {'image': img_response.content}
-        response = requests.post('https://api.imgur.com/3/image', headers=headers, files=files)
+        files = {'image': image_data}
+        response = http_post('https://api.imgur.com/3/image', headers=headers, files=files)
 
         if response.status_code == 200:
             imgur_url = response.json()['data']['link']
             logger.info(f"Successfully uploaded to Imgur: {imgur_url}")
+            store.record_upload(image_url, imgur_url)
             return imgur_url
         else:
             logger.error(f"Imgur upload failed: {response.text}")
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from http_client import http_get
+from file_utils import atomic_write_bytes, atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STORE_DIR = 'image_store'
+INDEX_FILE = 'index.json'
+# Facteur de réduction de la miniature servant à estimer la taille finale
+PROBE_SCALE = 4
+# Marge appliquée au réencodage quand l'estimation a été dépassée
+RESIZE_MARGIN = 0.9
+# Nombre de verrous partagés entre les clés (URLs, variantes) du cache d'images
+KEY_LOCK_STRIPES = 64
+
+def _read_number_env(name, default):
+    try:
+        return float(os.getenv(name, str(default)).split('#')[0].strip())
+    except ValueError:
+        return default
+
+def get_target_bytes():
+    """Taille visée pour une image encodée (IMAGE_TARGET_KB, 375 Ko soit environ 500 Ko en base64)"""
+    return int(_read_number_env("IMAGE_TARGET_KB", 375) * 1024)
+
+def encode_jpeg(data, max_size=(800, 800), target_bytes=None, quality=85):
+    """Réduit une image et l'encode en JPEG en une seule passe
+
+    Les JPEG sont décodés en mode brouillon (réduction 1/2 à 1/8 directement au
+    décodage). Si target_bytes est donné, la taille finale est estimée sur une
+    miniature et les dimensions sont réduites en conséquence avant l'encodage ;
+    l'estimation étant optimiste pour les images détaillées, un résultat trop
+    gros est réencodé une fois avec des dimensions corrigées.
+    """
+    # Import différé : Pillow n'est chargé que si une image doit être encodée
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    img.draft('RGB', max_size)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    def scaled(img, ratio):
+        return img.resize((max(1, int(img.width * ratio)), max(1, int(img.height * ratio))), Image.Resampling.LANCZOS)
+
+    def encode(img):
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+
+    if target_bytes:
+        probe = img.reduce(PROBE_SCALE) if min(img.size) >= PROBE_SCALE * 8 else img
+        buffer = BytesIO()
+        probe.save(buffer, format='JPEG', quality=quality)
+        estimated = buffer.tell() * (img.width * img.height) / (probe.width * probe.height)
+        if estimated > target_bytes:
+            img = scaled(img, (target_bytes / estimated) ** 0.5)
+
+    result = encode(img)
+    if target_bytes and len(result) > target_bytes:
+        result = encode(scaled(img, (target_bytes / len(result)) ** 0.5 * RESIZE_MARGIN))
+    return result
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _pool_context():
+    # Le pool est créé depuis les threads du pipeline : un fork du processus
+    # multi-thread n'est pas sûr, les processus partent d'un forkserver (ou spawn)
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def resize_image(data, max_size=(800, 800), target_bytes=None):
+    """Exécute encode_jpeg dans le pool de processus (IMAGE_RESIZE_WORKERS, 0 pour le thread courant)"""
+    global _pool
+    workers = int(_read_number_env("IMAGE_RESIZE_WORKERS", 2))
+    if workers <= 0:
+        return encode_jpeg(data, max_size, target_bytes)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        pool = _pool
+    try:
+        return pool.submit(encode_jpeg, data, max_size, target_bytes).result()
+    except BrokenProcessPool:
+        logger.error("Pool de redimensionnement interrompu, traitement dans le processus courant")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return encode_jpeg(data, max_size, target_bytes)
+
+class ImageStore:
+    """Cache disque des images, adressé par l'empreinte SHA-256 du contenu
+
+    Chaque URL n'est téléchargée qu'une fois ; une même image servie sous
+    plusieurs URLs n'est stockée, redimensionnée et envoyée sur Imgur qu'une
+    fois. Au-delà de max_bytes, les fichiers les moins récemment utilisés sont
+    supprimés à la sauvegarde.
+    """
+
+    def __init__(self, directory=IMAGE_STORE_DIR, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        self._dirty = False
+        self._index = self._load()
+
+    def _load(self):
+        index = {"urls": {}, "uploads": {}}
+        if not os.path.exists(self.index_path):
+            return index
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            index["urls"].update(data.get("urls", {}))
+            index["uploads"].update(data.get("uploads", {}))
+        except (OSError, ValueError) as e:
+            logger.error(f"Index du cache d'images illisible, il sera reconstruit: {str(e)}")
+        return index
+
+    def _key_lock(self, key):
+        # Verrous répartis par clé (nombre fixe) : deux threads ne téléchargent pas
+        # la même image en même temps, sans un verrou de plus par image rencontrée
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        return self._key_locks[int.from_bytes(digest[:4], 'big') % KEY_LOCK_STRIPES]
+
+    def _read(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # date d'utilisation pour l'éviction LRU
+            return data
+        except OSError:
+            return None
+
+    def _write(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_bytes(os.path.join(self.directory, name), data)
+
+    def _fetch(self, url, headers=None):
+        with self._key_lock(url):
+            with self._lock:
+                digest = self._index["urls"].get(url)
+            if digest:
+                data = self._read(digest)
+                if data is not None:
+                    return digest, data
+
+            logger.info(f"Téléchargement de l'image: {url}")
+            response = http_get(url, headers=headers)
+            response.raise_for_status()
+            data = response.content
+            digest = hashlib.sha256(data).hexdigest()
+            if not os.path.exists(os.path.join(self.directory, digest)):
+                self._write(digest, data)
+            with self._lock:
+                self._index["urls"][url] = digest
+                self._dirty = True
+            return digest, data
+
+    def fetch(self, url, headers=None):
+        """Contenu de l'image (téléchargée au premier appel seulement)"""
+        return self._fetch(url, headers)[1]
+
+    def prepare(self, url, max_size=(800, 800), target_bytes=None, headers=None):
+        """Image réduite et encodée en JPEG, calculée une seule fois par contenu et par format"""
+        digest, data = self._fetch(url, headers)
+        name = f"{digest}.{max_size[0]}x{max_size[1]}.{target_bytes or 0}.jpg"
+        with self._key_lock(name):
+            prepared = self._read(name)
+            if prepared is None:
+                prepared = resize_image(data, max_size, target_bytes)
+                self._write(name, prepared)
+            return prepared
+
+    def get_upload(self, url, headers=None):
+        """Lien Imgur déjà obtenu pour le contenu de cette image, ou None"""
+        digest = self._fetch(url, headers)[0]
+        with self._lock:
+            return self._index["uploads"].get(digest)
+
+    def record_upload(self, url, link):
+        with self._lock:
+            digest = self._index["urls"].get(url)
+            if digest:
+                self._index["uploads"][digest] = link
+                self._dirty = True
+
+    def _evict(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name != INDEX_FILE and not name.startswith('.')]
+        except OSError:
+            return
+        files = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+                self._dirty = True
+            except OSError:
+                continue
+        # Oublier les URLs dont l'image a été supprimée
+        self._index["urls"] = {url: digest for url, digest in self._index["urls"].items()
+                               if os.path.exists(os.path.join(self.directory, digest))}
+        known = set(self._index["urls"].values())
+        self._index["uploads"] = {digest: link for digest, link in self._index["uploads"].items() if digest in known}
+
+    def save(self):
+        """Applique l'éviction LRU et sauvegarde l'index si nécessaire"""
+        with self._lock:
+            self._evict()
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write_json(self.index_path, self._index)
+            self._dirty = False
+
+_image_store = None
+_image_store_lock = threading.Lock()
+
+def get_image_store():
+    """Retourne le cache d'images partagé (IMAGE_STORE_MAX_MB)"""
+    global _image_store
+    with _image_store_lock:
+        if _image_store is None:
+            max_mb = _read_number_env("IMAGE_STORE_MAX_MB", 200)
+            _image_store = ImageStore(max_bytes=int(max_mb * 1024 * 1024))
+        return _image_store
+
+def save_image_store():
+    """Sauvegarde le cache d'images s'il a été utilisé pendant l'exécution"""
+    with _image_store_lock:
+        store = _image_store
+    if store is not None:
+        store.save()
+
+def reset_image_store():
+    """Sauvegarde puis oublie le cache d'images et le pool de redimensionnement
+    (recréés avec la configuration courante)"""
+    global _image_store, _pool
+    with _image_store_lock:
+        if _image_store is not None:
+            _image_store.save()
+        _image_store = None
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import threading
+import time
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_FILE = 'image_cache.json'
+
+class ImageUrlCache:
+    """Cache persistant article -> URL de l'image principale
+
+    L'absence d'image est aussi mise en cache (pendant negative_ttl secondes,
+    plus court que ttl) pour ne pas re-scraper une page sans image à chaque
+    exécution. Au-delà de max_entries, les entrées les moins récemment
+    utilisées sont supprimées à la sauvegarde.
+    """
+
+    def __init__(self, file_path=IMAGE_CACHE_FILE, max_entries=2000, ttl=30 * 24 * 3600, negative_ttl=6 * 3600):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cache des images illisible, il sera reconstruit: {str(e)}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        if "entries" not in data:
+            # Ancien format : {url_article: url_image}
+            now = time.time()
+            self._dirty = True
+            return {url: {"image": image, "created": now, "last_used": now} for url, image in data.items() if image}
+        return data["entries"]
+
+    def _is_expired(self, entry, now):
+        ttl = self.ttl if entry["image"] else self.negative_ttl
+        return now - entry["created"] > ttl
+
+    def lookup(self, url):
+        """Retourne (trouvé, url_image) ; url_image vaut None si l'absence d'image est en cache"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or self._is_expired(entry, now):
+                return False, None
+            entry["last_used"] = now
+            self._dirty = True
+            return True, entry["image"]
+
+    def put(self, url, image_url):
+        """Enregistre l'image d'un article (None : aucune image trouvée)"""
+        now = time.time()
+        with self._lock:
+            self._entries[url] = {"image": image_url, "created": now, "last_used": now}
+            self._dirty = True
+
+    def _evict(self):
+        now = time.time()
+        self._entries = {url: entry for url, entry in self._entries.items() if not self._is_expired(entry, now)}
+        if len(self._entries) > self.max_entries:
+            kept = sorted(self._entries.items(), key=lambda item: item[1]["last_used"], reverse=True)[:self.max_entries]
+            self._entries = dict(kept)
+
+    def save(self):
+        """Applique l'éviction et sauvegarde le cache sur disque si nécessaire"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._evict()
+            atomic_write_json(self.file_path, {"entries": self._entries}, ensure_ascii=False)
+            self._dirty = False
+
+_image_url_cache = None
+_image_url_cache_lock = threading.Lock()
+
+def get_image_url_cache():
+    """Retourne le cache des images d'articles partagé (IMAGE_CACHE_MAX_ENTRIES, IMAGE_CACHE_TTL_DAYS, IMAGE_CACHE_NEGATIVE_TTL_HOURS)"""
+    global _image_url_cache
+    with _image_url_cache_lock:
+        if _image_url_cache is None:
+            try:
+                max_entries = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "2000").split('#')[0].strip())
+                ttl_days = float(os.getenv("IMAGE_CACHE_TTL_DAYS", "30").split('#')[0].strip())
+                negative_hours = float(os.getenv("IMAGE_CACHE_NEGATIVE_TTL_HOURS", "6").split('#')[0].strip())
+            except ValueError:
+                max_entries, ttl_days, negative_hours = 2000, 30, 6
+            _image_url_cache = ImageUrlCache(max_entries=max_entries, ttl=ttl_days * 24 * 3600, negative_ttl=negative_hours * 3600)
+        return _image_url_cache
+
+def reset_image_url_cache():
+    """Sauvegarde puis oublie le cache partagé (recréé avec la configuration courante)"""
+    global _image_url_cache
+    with _image_url_cache_lock:
+        if _image_url_cache is not None:
+            _image_url_cache.save()
+        _image_url_cache = None
@@ -7,6 +7,10 @@ MAIN_LOCK = 'main.lock'
 class LockError(Exception):
     pass
 
+# Verrous dont la suppression à la sortie est déjà enregistrée (un seul atexit par
+# fichier, même quand le démon prend le verrou à chaque exécution)
+_exit_cleanup = set()
+
 def create_lock(lock_file):
     """Crée un fichier de verrou"""
     with open(lock_file, 'w') as f:
@@ -32,7 +36,9 @@ def file_lock(lock_type="process"):
             if is_locked(self.lock_file) or is_locked(self.other_lock):
                 raise LockError("Un autre processus est en cours d'exécution")
             create_lock(self.lock_file)
-            atexit.register(lambda: remove_lock(self.lock_file))
+            if self.lock_file not in _exit_cleanup:
+                _exit_cleanup.add(self.lock_file)
+                atexit.register(remove_lock, self.lock_file)
             return self
 
         def __exit__(self, exc_type, exc_val, exc_tb):
@@ -1,14 +1,28 @@
 import os
+import importlib
+import signal
+import sys
+import threading
+import time
 from dotenv import load_dotenv
-from rss_reader import fetch_rss_feed, get_article_content
-from chatgpt_processor import process_with_chatgpt
-from notion_integration import create_notion_page
+from http_client import reset_session
+from notion_client import reset_notion_bucket
+from rss_reader import fetch_all_feeds, get_article_content
+import argparse
+from notion_integration import create_notion_page, is_retryable_status, queue_pending_page, take_pending_pages, reset_notion_breaker
+import config
 from config import RSS_FEEDS
-import json
-from article_tracker import add_processed_article
+from article_tracker import add_processed_article, is_article_processed, get_article_store
 from lock_manager import file_lock, LockError, is_cleaning_running
-from notion_cleaner import load_processed_articles, delete_page
 from image_handler import process_image_url
+from pipeline import Stage, run_pipeline
+from image_store import save_image_store, reset_image_store
+from image_url_cache import get_image_url_cache, reset_image_url_cache
+from feed_scheduler import get_feed_scheduler, reset_feed_scheduler, POLL_TOLERANCE
+from metrics import get_metrics, increment, set_gauge, export_run_metrics, start_metrics_server
+
+# chatgpt_processor (openai, tiktoken), analysis_cache et notion_cleaner sont importés
+# au premier usage : une exécution sans nouvel article ne les charge pas
 
 print("Début du script...")
 
@@ -24,51 +38,162 @@ def clean_json_string(analysis):
         analysis = analysis.replace('```json', '').replace('```', '').strip()
     return analysis
 
-def is_article_processed(url, processed_articles):
-    """Vérifie si un article avec l'URL donnée a déjà été traité"""
-    return any(article['url'] == url for article in processed_articles.get('articles', []))
+def clean_old_articles(store, number_to_remove=None):
+    """Supprime les n plus anciens articles du suivi et de Notion"""
+    from notion_cleaner import archive_pages
 
-def clean_old_articles(articles_data, number_to_remove=None):
-    """Supprime les n plus anciens articles du fichier JSON et de Notion"""
     if number_to_remove is None:
         number_to_remove = int(os.getenv("CLEAN_REMOVE_COUNT", "100"))
     
     print(f"\nNettoyage des anciens articles...")
     print(f"Nombre d'articles à supprimer: {number_to_remove}")
-    print(f"Nombre total d'articles avant nettoyage: {len(articles_data['articles'])}")
+    print(f"Nombre total d'articles avant nettoyage: {len(store)}")
     
-    # Trier les articles par date (du plus ancien au plus récent)
-    articles_data['articles'].sort(key=lambda x: x.get('date', ''))
+    # Articles à supprimer (les n plus anciens, via l'index par date)
+    articles_to_remove = store.oldest(number_to_remove)
     
-    # Articles à supprimer (les n premiers/plus anciens)
-    articles_to_remove = articles_data['articles'][:number_to_remove]
+    # Les articles sans page Notion sont retirés directement
+    removed_count = store.remove_many([article['url'] for article in articles_to_remove if not article.get('notion_id')])
     
-    # Supprimer sur Notion
-    for article in articles_to_remove:
-        notion_id = article.get('notion_id')
-        if notion_id:
-            print(f"Suppression de la page Notion pour {article['title']}")
-            if delete_page(notion_id):
-                print("✓ Page Notion supprimée") 
-            else:
-                print("✗ Erreur lors de la suppression de la page Notion")
+    # Archivage parallèle sur Notion ; seuls les articles archivés sont retirés du suivi (un lot à la fois)
+    items = [(article['notion_id'], article['url']) for article in articles_to_remove if article.get('notion_id')]
+    archived_count, failed_count, archived_removed = archive_pages(items, on_archived=store.remove_many)
+    removed_count += archived_removed
+    if failed_count:
+        print(f"✗ {failed_count} pages Notion non archivées, conservées pour le prochain nettoyage")
+    
+    print(f"Nombre d'articles supprimés: {removed_count}")
+    print(f"Nombre total d'articles après nettoyage: {len(store)}")
+    
+    return store
+
+def read_int_env(name, default):
+    """Lit une variable d'environnement entière (les commentaires en fin de ligne sont ignorés)"""
+    raw_value = os.getenv(name, str(default)).strip().split('#')[0].strip()
+    try:
+        return int(raw_value)
+    except ValueError:
+        print(f"Erreur: {name} invalide ({raw_value}), utilisation de la valeur par défaut ({default})")
+        return default
+
+def adaptive_polling_enabled():
+    """Relève de chaque flux à son propre rythme (FEED_ADAPTIVE_POLLING)"""
+    return os.getenv("FEED_ADAPTIVE_POLLING", "true").split('#')[0].strip().lower() == "true"
+
+def scrape_article(job):
+    """Étape 1 : récupère le contenu et l'image de l'article"""
+    entry = job['entry']
+    # Un seul print par bloc pour ne pas mélanger les sorties des workers
+    print(f"Flux: {job['feed']['name']}\nTitre: {entry['title']}\nLien: {entry['link']}")
+    
+    # Fetch content for the specific article on demand
+    article_content = get_article_content(entry['link'], entry)
+    full_content = article_content['content']
     
-    # Supprimer du JSON
-    articles_data['articles'] = articles_data['articles'][number_to_remove:]
+    # Process image URL based on source
+    raw_image_url = article_content['image_url']
+    job['image_url'] = process_image_url(raw_image_url, job['feed']['name'])
+    job['content'] = full_content or entry['summary']
     
-    print(f"Nombre d'articles supprimés: {number_to_remove}")
-    print(f"Nombre total d'articles après nettoyage: {len(articles_data['articles'])}")
+    if job['image_url'] or entry['published_date']:
+        print(f"Image: {job['image_url']}\nDate: {entry['published_date']}")
+    return job
+
+def analyze_article(job, api_key):
+    """Étape 2 : analyse l'article avec ChatGPT"""
+    from chatgpt_processor import process_with_chatgpt, remember_analysed_article
+    job['analysis'] = process_with_chatgpt(job['entry']['title'], job['content'], api_key)
+    # Visible des analyses suivantes avant même sa publication (doublons d'une même exécution)
+    remember_analysed_article(job['entry']['link'], job['entry']['title'], job['content'], job['analysis'])
+    return job
+
+def publish_article(job):
+    """Étape 3 : crée la page Notion et ajoute l'article au suivi"""
+    entry = job['entry']
+    feed_name = job['feed']['name']
+    print(f"Création de la page Notion: {entry['title']}")
+    
+    status_code, response = create_notion_page(
+        entry['title'], 
+        job['content'],
+        job['analysis'],  # Utiliser l'analyse de ChatGPT ici
+        job['image_url'],
+        entry['link'],
+        entry['published_date'],
+        feed_name
+    )
     
-    # Sauvegarder le fichier mis à jour
-    with open('processed_articles.json', 'w') as f:
-        json.dump(articles_data, f, indent=4)
+    if status_code != 200:
+        if is_retryable_status(status_code):
+            # Notion indisponible ou limité : l'article sera renvoyé à la prochaine exécution
+            queue_pending_page(job)
+            increment("articles", status="pending")
+        else:
+            # Article abandonné : il ne doit plus servir de référence pour les doublons
+            from similarity_index import get_similarity_index
+            get_similarity_index().remove(entry['link'])
+            increment("articles", status="failed")
+        return None
     
-    return articles_data
+    # Récupérer l'ID de la page Notion créée
+    notion_id = response.get('id') if response else None
+    add_processed_article(
+        entry['link'],
+        title=entry['title'],
+        content=job['content'],
+        analysis=job['analysis'],  # Utiliser l'analyse de ChatGPT ici aussi
+        date=entry['published_date'],
+        image_url=job['image_url'],
+        source=feed_name,
+        notion_id=notion_id  # Ajouter l'ID Notion ici
+    )
+    print(f"Article envoyé à Notion (ID: {notion_id}) et ajouté au suivi")
+    increment("articles", status="published")
+    return job
 
-def process_new_articles():
+def process_jobs(jobs, api_key, llm_mode, pipeline_enabled):
+    """Scrape, analyse et publie les nouveaux articles"""
+    from analysis_cache import get_analysis_cache
+
+    analysis_cache = get_analysis_cache()
+    analysis_cache.reset_stats()
+    
+    queue_size = read_int_env("PIPELINE_QUEUE_SIZE", 10)
+    if llm_mode == "batch":
+        # Mode hors ligne : tout est scrapé, analysé en un lot par l'API Batch, puis publié
+        from chatgpt_processor import process_batch_with_chatgpt
+        print("Mode batch : analyse de tous les articles via l'API Batch d'OpenAI")
+        scraped_jobs = run_pipeline(jobs, [Stage("scrape", scrape_article, read_int_env("SCRAPE_WORKERS", 4))], queue_size)
+        analyses = process_batch_with_chatgpt(
+            [(job['entry']['link'], job['entry']['title'], job['content']) for job in scraped_jobs],
+            api_key,
+            poll_interval=read_int_env("OPENAI_BATCH_POLL_INTERVAL", 30)
+        )
+        for job in scraped_jobs:
+            job['analysis'] = analyses[job['entry']['link']]
+        run_pipeline(scraped_jobs, [Stage("notion", publish_article, read_int_env("NOTION_WORKERS", 2))], queue_size)
+    elif pipeline_enabled:
+        stages = [
+            Stage("scrape", scrape_article, read_int_env("SCRAPE_WORKERS", 4)),
+            Stage("llm", lambda job: analyze_article(job, api_key), read_int_env("LLM_WORKERS", 2)),
+            Stage("notion", publish_article, read_int_env("NOTION_WORKERS", 2)),
+        ]
+        print("Pipeline: " + ", ".join(f"{stage.name}={stage.workers}" for stage in stages))
+        run_pipeline(jobs, stages, queue_size=queue_size)
+    else:
+        for job in jobs:
+            job = scrape_article(job)
+            job = analyze_article(job, api_key)
+            publish_article(job)
+    
+    print(analysis_cache.report())
+    analysis_cache.save()
+
+def process_new_articles(llm_mode=None):
     try:
         with file_lock(lock_type="main"):
             load_dotenv(override=True)
+            get_metrics().reset()
             
             print("Chargement des variables d'environnement...")
             api_key = os.getenv("OPENAI_API_KEY")
@@ -81,6 +206,10 @@ def process_new_articles():
                 max_articles_per_feed = 3
 
             print(f"MAX_ARTICLES_PER_FEED configuré à: {max_articles_per_feed}")
+            feed_fetch_workers = read_int_env("FEED_FETCH_WORKERS", 8)
+            feed_fetch_per_host = read_int_env("FEED_FETCH_PER_HOST", 2)
+            pipeline_enabled = os.getenv("PIPELINE_ENABLED", "true").lower() == "true"
+            llm_mode = llm_mode or os.getenv("LLM_MODE", "concurrent").strip().lower()
             
             if is_cleaning_running():
                 print("Le nettoyage de la base de données est en cours. Réessayez plus tard.")
@@ -92,87 +221,177 @@ def process_new_articles():
             
             print("Début du traitement des flux RSS...")
             
-            articles_data = load_processed_articles("processed_articles.json")
-            print("\nDébug chargement articles:")
-            print(f"Structure chargée: {type(articles_data)}")
-            print(f"Nombre d'articles chargés: {len(articles_data.get('articles', []))}")
+            article_store = get_article_store()
+            # En mode démon, le suivi a pu être modifié par notion_cleaner entre deux exécutions
+            article_store.reload_if_changed()
+            print(f"\nNombre d'articles chargés: {len(article_store)}")
+            
+            # Seuls les flux dont la prochaine relève est due sont interrogés
+            scheduler = get_feed_scheduler() if adaptive_polling_enabled() else None
+            feeds = scheduler.due_feeds(RSS_FEEDS) if scheduler else RSS_FEEDS
+            set_gauge("feeds_polled", len(feeds))
+            set_gauge("feeds_skipped", len(RSS_FEEDS) - len(feeds))
+            if len(feeds) < len(RSS_FEEDS):
+                print(f"{len(RSS_FEEDS) - len(feeds)} flux non dus ignorés (relève adaptative)")
+            
+            print(f"Récupération parallèle de {len(feeds)} flux ({feed_fetch_workers} simultanés, {feed_fetch_per_host} par hôte)...")
+            feed_results = fetch_all_feeds(
+                feeds,
+                max_workers=feed_fetch_workers,
+                max_per_host=feed_fetch_per_host,
+                max_entries=max_articles_per_feed,
+                is_processed=is_article_processed
+            )
             
-            for feed in RSS_FEEDS:
+            # Articles analysés mais dont la page Notion n'a pas pu être créée précédemment
+            pending_jobs = [job for job in take_pending_pages() if not is_article_processed(job['entry']['link'])]
+            if pending_jobs:
+                print(f"\nEnvoi de {len(pending_jobs)} page(s) Notion en attente...")
+                run_pipeline(pending_jobs, [Stage("notion", publish_article, read_int_env("NOTION_WORKERS", 2))], read_int_env("PIPELINE_QUEUE_SIZE", 10))
+            
+            jobs = []
+            queued_urls = {job['entry']['link'] for job in pending_jobs}
+            for feed, entries in feed_results:
                 rss_url = feed["url"]
                 feed_name = feed["name"]
-                print(f"Fetching feed from: {feed_name} ({rss_url})")
-                entries = fetch_rss_feed(rss_url)
-                print(f"Nombre total d'articles trouvés: {len(entries)}")
-                entries = entries[:max_articles_per_feed]
-                print(f"Nombre d'articles après limite: {len(entries)}")
+                print(f"Traitement du flux: {feed_name} ({rss_url})")
+                if entries is None:
+                    print(f"Échec de la récupération du flux : {feed_name}")
+                    if scheduler:
+                        # Un échec ne dit rien du rythme du flux : nouvel essai sans backoff
+                        interval = scheduler.record_failure(rss_url)
+                        print(f"Nouvel essai de {feed_name} dans {interval / 60:.0f} min")
+                    continue
+                print(f"Nombre d'articles lus: {len(entries)}")
                 if not entries:
                     print(f"Aucun article trouvé pour le flux : {feed_name}")
-                    continue
+                # Au plus MAX_ARTICLES_PER_FEED nouveaux articles par flux
+                feed_jobs = 0
                 for entry in entries:
-                    if is_article_processed(entry['link'], articles_data):
+                    if feed_jobs >= max_articles_per_feed:
+                        break
+                    if is_article_processed(entry['link']) or entry['link'] in queued_urls:
                         print(f"Article déjà traité : {entry['link']}")
                         continue
-                    
-                    print("Flux:", feed_name)
-                    print("Titre:", entry['title'])
-                    print("Lien:", entry['link'])
-                    
-                    # Fetch content for the specific article on demand
-                    article_content = get_article_content(entry['link'])
-                    full_content = article_content['content']
-                    
-                    # Process image URL based on source
-                    raw_image_url = article_content['image_url']
-                    image_url = process_image_url(raw_image_url, feed["name"])
-                    
-                    content_to_use = full_content or entry['summary']
-                    
-                    if image_url:
-                        print("Image:", image_url)
-                    
-                    published_date = entry['published_date']
-                    if published_date:
-                        print("Date:", published_date)
-                    
-                    # Analyser l'article avec ChatGPT
-                    analysis = process_with_chatgpt(entry['title'], content_to_use, api_key, articles_data)
-                    
-                    print("Création de la page Notion")
-                    
-                    status_code, response = create_notion_page(
-                        entry['title'], 
-                        content_to_use,
-                        analysis,  # Utiliser l'analyse de ChatGPT ici
-                        image_url,
-                        entry['link'],
-                        published_date,
-                        feed_name
-                    )
-                    
-                    if status_code == 200:
-                        # Récupérer l'ID de la page Notion créée
-                        notion_id = response.get('id') if response else None
-                        add_processed_article(
-                            entry['link'],
-                            title=entry['title'],
-                            content=content_to_use,
-                            analysis=analysis,  # Utiliser l'analyse de ChatGPT ici aussi
-                            date=published_date,
-                            image_url=image_url,
-                            source=feed_name,
-                            notion_id=notion_id  # Ajouter l'ID Notion ici
-                        )
-                        print(f"Article envoyé à Notion (ID: {notion_id}) et ajouté au suivi")
+                    queued_urls.add(entry['link'])
+                    jobs.append({'entry': entry, 'feed': feed})
+                    feed_jobs += 1
+                if scheduler:
+                    interval = scheduler.record_poll(rss_url, entries, feed_jobs)
+                    print(f"Prochaine relève de {feed_name} dans {interval / 60:.0f} min")
+            if scheduler:
+                scheduler.save()
+            
+            print(f"\nNombre de nouveaux articles à traiter: {len(jobs)}")
+            
+            if jobs:
+                process_jobs(jobs, api_key, llm_mode, pipeline_enabled)
+            else:
+                print("Aucun nouvel article : analyse et publication ignorées")
+            save_image_store()
+            get_image_url_cache().save()
             
             # Déplacer le nettoyage ici, après avoir traité tous les nouveaux articles
-            if len(articles_data.get('articles', [])) > auto_clean_threshold:
-                articles_data = clean_old_articles(articles_data)
+            if len(article_store) > auto_clean_threshold:
+                clean_old_articles(article_store)
+            
+            set_gauge("articles_new", len(jobs))
+            set_gauge("articles_tracked", len(article_store))
+            export_run_metrics()
                 
     except LockError:
         print("Un autre processus est en cours d'exécution. Réessayez plus tard.")
         return False
 
+def reset_configured_objects():
+    """Oublie les objets construits avec l'ancienne configuration (session HTTP,
+    limiteurs, disjoncteur, caches) ; ils sont recréés au premier usage"""
+    reset_session()
+    reset_notion_bucket()
+    reset_notion_breaker()
+    reset_feed_scheduler()
+    reset_image_url_cache()
+    reset_image_store()
+    # Modules chargés au premier usage : rien à oublier s'ils ne l'ont pas encore été
+    for module_name, reset_name in (("chatgpt_processor", "reset_openai_state"), ("analysis_cache", "reset_analysis_cache")):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, reset_name)()
+
+def reload_configuration():
+    """Relit .env et la liste des flux de config.py (SIGHUP en mode démon)"""
+    global RSS_FEEDS
+    load_dotenv(override=True)
+    reset_configured_objects()
+    try:
+        RSS_FEEDS = importlib.reload(config).RSS_FEEDS
+    except Exception as e:
+        print(f"Erreur lors du rechargement de config.py, liste des flux inchangée: {e}")
+        return
+    print(f"Configuration rechargée ({len(RSS_FEEDS)} flux)")
+
+# Attente minimale entre deux exécutions du démon, même si un flux est déjà dû
+DAEMON_MIN_SLEEP = 30
+
+def run_daemon(llm_mode=None):
+    """Mode démon : traite les flux dans le même processus, toutes les DAEMON_INTERVAL
+    secondes au plus, plus tôt si la relève adaptative d'un flux est due
+
+    Les clients HTTP, le tokenizer, le suivi des articles et les caches restent en
+    mémoire entre deux exécutions. SIGTERM arrête le démon après l'exécution en
+    cours, SIGHUP recharge la configuration avant la prochaine.
+    """
+    stop_requested = threading.Event()
+    reload_requested = threading.Event()
+    wake_up = threading.Event()
+
+    def request(event):
+        def handler(signum, frame):
+            event.set()
+            wake_up.set()
+        return handler
+
+    signal.signal(signal.SIGTERM, request(stop_requested))
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, request(reload_requested))
+
+    print(f"Mode démon démarré (PID {os.getpid()})")
+    while not stop_requested.is_set():
+        started = time.monotonic()
+        try:
+            process_new_articles(llm_mode=llm_mode)
+        except Exception as e:
+            # Une exécution en échec ne doit pas arrêter le démon
+            print(f"Erreur pendant l'exécution: {e}")
+
+        deadline = started + read_int_env("DAEMON_INTERVAL", 600)
+        if adaptive_polling_enabled():
+            # Réveil dès qu'un flux est dû, au plus tard après DAEMON_INTERVAL
+            next_due = get_feed_scheduler().next_poll(RSS_FEEDS) - POLL_TOLERANCE - time.time()
+            deadline = min(deadline, time.monotonic() + max(DAEMON_MIN_SLEEP, next_due))
+        while not stop_requested.is_set():
+            if reload_requested.is_set():
+                reload_requested.clear()
+                reload_configuration()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wake_up.wait(remaining)
+            wake_up.clear()
+    print("Arrêt du démon")
+
 if __name__ == "__main__":
-    print("Appel de la fonction main...")
-    process_new_articles()
+    parser = argparse.ArgumentParser(description="Traitement des nouveaux articles des flux RSS")
+    parser.add_argument("--llm-mode", choices=["concurrent", "batch"],
+                        help="concurrent : appels ChatGPT en parallèle (par défaut), batch : API Batch d'OpenAI pour les rattrapages")
+    parser.add_argument("--daemon", action="store_true",
+                        help="reste actif et traite les flux toutes les DAEMON_INTERVAL secondes")
+    args = parser.parse_args()
+    
+    start_metrics_server()
+    if args.daemon:
+        run_daemon(llm_mode=args.llm_mode)
+    else:
+        print("Appel de la fonction main...")
+        process_new_articles(llm_mode=args.llm_mode)
     print("Fin du script...")
@@ -0,0 +1,217 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from file_utils import atomic_write_json, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "news_"
+METRICS_DIR = "metrics"
+# Nombre maximal de mesures conservées par chronomètre pour le calcul des quantiles
+MAX_SAMPLES = 10000
+QUANTILES = (0.5, 0.95)
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _quantile(ordered, fraction):
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+class Metrics:
+    """Compteurs, jauges et chronomètres d'une exécution, thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._counters = {}
+            self._gauges = {}
+            self._timers = {}
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            key = (name, _label_key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        """Enregistre une durée (secondes) pour le chronomètre name"""
+        with self._lock:
+            key = (name, _label_key(labels))
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = {"count": 0, "sum": 0.0, "max": 0.0, "samples": deque(maxlen=MAX_SAMPLES)}
+            timer["count"] += 1
+            timer["sum"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+            timer["samples"].append(seconds)
+
+    def snapshot(self):
+        """État courant sous forme de dictionnaire sérialisable en JSON"""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self._counters.items()]
+            gauges = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self._gauges.items()]
+            timers = []
+            for (name, labels), timer in self._timers.items():
+                ordered = sorted(timer["samples"])
+                entry = {"name": name, "labels": dict(labels), "count": timer["count"],
+                         "sum": timer["sum"], "max": timer["max"]}
+                for fraction in QUANTILES:
+                    entry[f"p{int(fraction * 100)}"] = _quantile(ordered, fraction) if ordered else 0.0
+                timers.append(entry)
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "duration": time.time() - self.started_at,
+                "counters": counters,
+                "gauges": gauges,
+                "timers": timers,
+            }
+
+    def to_prometheus(self):
+        """Format texte d'exposition Prometheus"""
+        def labels_text(labels, extra=None):
+            items = list(labels.items()) + list((extra or {}).items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for counter in snapshot["counters"]:
+            name = METRICS_PREFIX + counter["name"] + "_total"
+            declare(name, "counter")
+            lines.append(f"{name}{labels_text(counter['labels'])} {counter['value']}")
+        for gauge in snapshot["gauges"]:
+            name = METRICS_PREFIX + gauge["name"]
+            declare(name, "gauge")
+            lines.append(f"{name}{labels_text(gauge['labels'])} {gauge['value']}")
+        for timer in snapshot["timers"]:
+            name = METRICS_PREFIX + timer["name"] + "_seconds"
+            declare(name, "summary")
+            for fraction in QUANTILES:
+                quantile = {"quantile": f"{fraction:g}"}
+                lines.append(f"{name}{labels_text(timer['labels'], quantile)} {timer[f'p{int(fraction * 100)}']:.6f}")
+            lines.append(f"{name}_sum{labels_text(timer['labels'])} {timer['sum']:.6f}")
+            lines.append(f"{name}_count{labels_text(timer['labels'])} {timer['count']}")
+        name = METRICS_PREFIX + "run_started_timestamp_seconds"
+        declare(name, "gauge")
+        lines.append(f"{name} {self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+_metrics = Metrics()
+
+def get_metrics():
+    return _metrics
+
+def increment(name, value=1, **labels):
+    _metrics.increment(name, value, **labels)
+
+def set_gauge(name, value, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+def observe(name, seconds, **labels):
+    _metrics.observe(name, seconds, **labels)
+
+@contextmanager
+def timer(name, **labels):
+    """Mesure la durée d'un bloc ; status=error si une exception est levée"""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _metrics.observe(name, time.perf_counter() - start, status=status, **labels)
+
+def timed(name):
+    """Décorateur : mesure chaque appel de la fonction avec timer(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_token_usage(usage, mode="concurrent"):
+    """Ajoute les tokens consommés (objet usage de l'API OpenAI ou dictionnaire)"""
+    if usage is None:
+        return
+    if isinstance(usage, dict):
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    else:
+        prompt_tokens, completion_tokens = getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    if prompt_tokens:
+        increment("openai_prompt_tokens", prompt_tokens, mode=mode)
+    if completion_tokens:
+        increment("openai_completion_tokens", completion_tokens, mode=mode)
+
+def export_run_metrics(directory=None):
+    """Écrit les métriques de l'exécution : last_run.json, une ligne dans runs.jsonl
+    et le fichier texte Prometheus (METRICS_PROMETHEUS_FILE, pour le collecteur textfile)"""
+    directory = directory or os.getenv("METRICS_DIR", METRICS_DIR).split('#')[0].strip() or METRICS_DIR
+    try:
+        os.makedirs(directory, exist_ok=True)
+        snapshot = _metrics.snapshot()
+        atomic_write_json(os.path.join(directory, "last_run.json"), snapshot, indent=2, ensure_ascii=False)
+        with open(os.path.join(directory, "runs.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+        prometheus_file = os.getenv("METRICS_PROMETHEUS_FILE", "").split('#')[0].strip() or os.path.join(directory, "news_py.prom")
+        atomic_write_text(prometheus_file, _metrics.to_prometheus())
+    except OSError as e:
+        logger.error(f"Erreur lors de l'export des métriques: {str(e)}")
+
+_server = None
+
+def start_metrics_server(port=None, host=None):
+    """Expose /metrics au format Prometheus (METRICS_PORT, METRICS_HOST) ; ne fait rien si aucun port n'est configuré"""
+    global _server
+    if port is None:
+        port = os.getenv("METRICS_PORT", "").split('#')[0].strip()
+    if host is None:
+        host = os.getenv("METRICS_HOST", "127.0.0.1").split('#')[0].strip() or "127.0.0.1"
+    if not port or _server is not None:
+        return _server
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = _metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Métriques exposées sur http://{host}:{port}/metrics")
+    return _server
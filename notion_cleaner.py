@@ -1,64 +1,103 @@
 import os
-import requests
+from notion_client import notion_request, notion_map, get_database_id
 from dotenv import load_dotenv
-import time
-import json
 from lock_manager import file_lock, LockError, is_main_running
+from article_tracker import get_article_store
 import glob  # Ajouter cet import pour la gestion des fichiers
+import argparse
+from itertools import islice
+from urllib.parse import unquote
+from metrics import timed
 
-load_dotenv()
+def date_before(date):
+    """Filtre Notion : pages dont la propriété Date est antérieure à date (ISO 8601)"""
+    return {"property": "Date", "date": {"before": date}}
 
-NOTION_API_URL = "https://api.notion.com/v1"
-NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-NOTION_API_KEY = os.getenv("NOTION_API_KEY")
+def is_double():
+    """Filtre Notion : pages marquées comme doublon"""
+    return {"property": "Double", "checkbox": {"equals": True}}
 
-def get_database_pages():
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
-    url = f"{NOTION_API_URL}/databases/{NOTION_DATABASE_ID}/query"
-    
-    pages = []
-    has_more = True
+def score_below(score):
+    """Filtre Notion : pages dont le Score est strictement inférieur à score"""
+    return {"property": "Score", "number": {"less_than": score}}
+
+def combine_filters(*filters, mode="and"):
+    """Combine plusieurs filtres Notion ("and" ou "or"), None si aucun filtre"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return {mode: filters}
+
+def sort_by(property_name, direction="ascending"):
+    return {"property": property_name, "direction": direction}
+
+def get_property_ids(names):
+    """Identifiants des propriétés de la base (pour filter_properties), None en cas d'erreur"""
+    response = notion_request("GET", f"/databases/{get_database_id()}")
+    if response.status_code != 200:
+        print(f"Erreur lors de la récupération du schéma: {response.status_code}")
+        return None
+    properties = response.json().get("properties", {})
+    return [properties[name]["id"] for name in names if "id" in properties.get(name, {})]
+
+def query_database(filter=None, sorts=None, page_size=100, filter_properties=None):
+    """Itère sur les pages de la base, page de résultats par page de résultats
+
+    Les filtres et tris sont appliqués côté serveur. filter_properties (liste
+    d'identifiants de propriétés) limite les propriétés renvoyées ; une liste
+    vide ne renvoie aucune propriété. Les pages sont produites dès réception,
+    sans attendre la fin de la pagination.
+    """
+    path = f"/databases/{get_database_id()}/query"
+    params = None
+    if filter_properties:
+        # Les identifiants du schéma sont déjà encodés pour l'URL
+        params = {"filter_properties": [unquote(property_id) for property_id in filter_properties]}
     next_cursor = None
     
-    while has_more:
-        body = {}
+    while True:
+        body = {"page_size": page_size}
+        if filter:
+            body["filter"] = filter
+        if sorts:
+            body["sorts"] = sorts
         if next_cursor:
             body["start_cursor"] = next_cursor
             
-        response = requests.post(url, headers=headers, json=body)
+        # Lecture seule malgré le POST : peut être renvoyée sans risque
+        response = notion_request("POST", path, json=body, params=params, idempotent=True)
         data = response.json()
         
         if response.status_code != 200:
             print(f"Erreur lors de la récupération des pages: {response.status_code}")
             print(f"Message: {data.get('message')}")
-            break
+            return
             
-        pages.extend(data.get("results", []))
-        has_more = data.get("has_more", False)
+        yield from data.get("results", [])
         next_cursor = data.get("next_cursor")
-        
-    return pages
+        if not data.get("has_more", False) or not next_cursor:
+            return
 
+def get_database_pages(**query):
+    """Toutes les pages de la base (voir query_database pour les options)"""
+    return list(query_database(**query))
+
+@timed("delete_page")
 def delete_page(page_id):
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
-    url = f"{NOTION_API_URL}/pages/{page_id}"
-    
     # Au lieu de DELETE, on utilise PATCH pour archiver la page
     data = {
         "archived": True
     }
     
-    response = requests.patch(url, headers=headers, json=data)
+    response = notion_request("PATCH", f"/pages/{page_id}", json=data)
+    
+    # Page supprimée ou plus partagée avec l'intégration : rien à archiver, on la
+    # considère comme archivée pour qu'elle sorte du suivi local
+    if response.status_code == 404:
+        print(f"Page {page_id} introuvable dans Notion, considérée comme archivée")
+        return True
     
     if response.status_code != 200:
         print(f"Erreur d'archivage: {response.status_code}")
@@ -66,6 +105,44 @@ def delete_page(page_id):
         
     return response.status_code == 200
 
+def _archive_item(item):
+    page_id, url = item
+    try:
+        return delete_page(page_id)
+    except Exception as e:
+        print(f"Erreur lors de l'archivage de la page {page_id}: {str(e)}")
+        return False
+
+def archive_pages(items, on_archived=None, batch_size=None):
+    """Archive des pages Notion en parallèle, par lots de NOTION_ARCHIVE_BATCH pages
+
+    items est un itérable de (page_id, url), consommé au fur et à mesure. Après chaque lot, on_archived reçoit
+    les URLs des pages archivées avec succès : le suivi local est mis à jour une
+    fois par lot, et une interruption ne perd au plus que le lot en cours (une
+    nouvelle exécution reprend avec les pages restantes).
+    Retourne (pages archivées, échecs, valeur cumulée retournée par on_archived).
+    """
+    if batch_size is None:
+        try:
+            batch_size = int(os.getenv("NOTION_ARCHIVE_BATCH", "50").split('#')[0].strip())
+        except ValueError:
+            batch_size = 50
+    batch_size = max(1, batch_size)
+    archived = failed = removed = 0
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+        results = notion_map(_archive_item, batch)
+        urls = [url for (page_id, url), ok in zip(batch, results) if ok and url]
+        archived += sum(1 for ok in results if ok)
+        failed += sum(1 for ok in results if not ok)
+        if on_archived and urls:
+            removed += on_archived(urls) or 0
+        print(f"Archivage: {archived + failed} pages traitées ({archived} archivées, {failed} erreurs)")
+    return archived, failed, removed
+
 def get_page_url(page):
     """Récupère l'URL de la page depuis ses propriétés"""
     try:
@@ -73,29 +150,6 @@ def get_page_url(page):
     except:
         return None
 
-def load_processed_articles(filepath="processed_articles.json"):
-    try:
-        with open(filepath, 'r') as f:
-            processed_articles = json.load(f)
-            # Si c'est une liste (ancien format), convertir en dictionnaire
-            if isinstance(processed_articles, list):
-                return {"articles": processed_articles}
-            return processed_articles
-    except FileNotFoundError:
-        return {"articles": []}
-
-def save_processed_articles(data, filepath="processed_articles.json"):
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
-
-def remove_article_by_url(articles_data, url):
-    """Supprime un article du fichier JSON par son URL"""
-    articles_data["articles"] = [
-        article for article in articles_data["articles"] 
-        if article["url"] != url
-    ]
-    return articles_data
-
 def clean_log_files():
     """Nettoie les fichiers de logs ChatGPT"""
     try:
@@ -113,7 +167,10 @@ def clean_log_files():
         print(f"Erreur lors du nettoyage des logs: {e}")
         return 0
 
-def clean_database():
+MAX_CLEAN_PASSES = 3
+
+def clean_database(filter=None):
+    """Archive les pages de la base (toutes, ou celles qui correspondent au filtre)"""
     try:
         if is_main_running():
             print("Le processus principal est en cours d'exécution. Réessayez plus tard.")
@@ -122,71 +179,49 @@ def clean_database():
         with file_lock(lock_type="process"):
             print("Verrou acquis. Début du nettoyage...")
             
-            # Nettoyage des logs ChatGPT
-            print("\nNettoyage des logs ChatGPT...")
-            logs_deleted = clean_log_files()
-            print(f"Nombre de fichiers logs supprimés : {logs_deleted}")
+            # Nettoyage des logs ChatGPT (uniquement pour un nettoyage complet)
+            logs_deleted = 0
+            if filter is None:
+                print("\nNettoyage des logs ChatGPT...")
+                logs_deleted = clean_log_files()
+                print(f"Nombre de fichiers logs supprimés : {logs_deleted}")
             
             print("\nNettoyage de la base de données Notion...")
-            print("Récupération des pages de la base de données...")
-            pages = get_database_pages()
-            
-            if not pages:
-                print("Erreur: Impossible de récupérer les pages de la base de données ou base vide")
-                return
-                
-            total_pages = len(pages)
-            print(f"Nombre de pages à supprimer : {total_pages}")
+            # Seule la propriété URL est nécessaire pour mettre à jour le suivi
+            url_property = get_property_ids(["URL"]) or None
             
-            if total_pages == 0:
-                print("Aucune page trouvée dans la base de données.")
-                return
-            
-            # Charger la liste des articles traités
-            articles_data = load_processed_articles()
-            deleted_count = 0
+            # Stockage partagé des articles traités
+            article_store = get_article_store()
             errors_count = 0
-            
-            for i, page in enumerate(pages, 1):
-                try:
+            archived_count = 0
+            deleted_count = 0
+
+            def page_items(invalid_pages):
+                for page in query_database(filter=filter, filter_properties=url_property):
                     page_id = page.get("id")
                     if not page_id:
-                        print(f"Page {i} invalide: ID manquant")
-                        errors_count += 1
+                        invalid_pages.append(page)
                         continue
-                        
-                    properties = page.get("properties", {})
-                    title_info = properties.get("Title", {}).get("title", [{}])
-                    title = title_info[0].get("text", {}).get("content", "Sans titre") if title_info else "Sans titre"
-                    url = get_page_url(page)
-
-                    print(f"Suppression de la page {i}/{total_pages}: {title}")
-                    
-                    if delete_page(page_id):
-                        print(f"✓ Page supprimée avec succès")
-                        if url:
-                            # Mettre à jour le fichier JSON après chaque suppression réussie
-                            articles_data = remove_article_by_url(articles_data, url)
-                            try:
-                                save_processed_articles(articles_data)
-                                deleted_count += 1
-                                print(f"✓ Article supprimé du fichier JSON")
-                            except Exception as e:
-                                print(f"✗ Erreur lors de la sauvegarde du fichier JSON : {str(e)}")
-                                errors_count += 1
-                    else:
-                        print(f"✗ Erreur lors de la suppression de la page {page_id}")
-                        errors_count += 1
-                        
-                    time.sleep(0.5)  # Anti rate-limit
-                    
-                except Exception as e:
-                    print(f"Erreur lors du traitement de la page {i}: {str(e)}")
-                    errors_count += 1
-                    continue
+                    yield page_id, get_page_url(page)
+
+            # Les pages sont archivées pendant le chargement des suivantes ; l'archivage
+            # pouvant décaler la pagination, une nouvelle passe reprend les pages restantes
+            for attempt in range(MAX_CLEAN_PASSES):
+                invalid_pages = []
+                archived, failed, deleted = archive_pages(page_items(invalid_pages), on_archived=article_store.remove_many)
+                if invalid_pages:
+                    print(f"{len(invalid_pages)} pages invalides: ID manquant")
+                archived_count += archived
+                deleted_count += deleted
+                errors_count += failed + len(invalid_pages)
+                if archived == 0 or failed:
+                    break
+            
+            if archived_count == 0 and errors_count == 0:
+                print("Aucune page trouvée dans la base de données.")
             
             print("\nNettoyage terminé!")
-            print(f"Pages Notion supprimées : {total_pages}")
+            print(f"Pages Notion supprimées : {archived_count}")
             print(f"Articles supprimés du JSON : {deleted_count}")
             print(f"Fichiers logs supprimés : {logs_deleted}")
             print(f"Erreurs rencontrées : {errors_count}")
@@ -200,4 +235,14 @@ def clean_database():
             os.remove('process.lock')
 
 if __name__ == "__main__":
-    clean_database()
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Archive les pages de la base Notion (toutes par défaut)")
+    parser.add_argument("--before", help="uniquement les pages dont la Date est antérieure (AAAA-MM-JJ)")
+    parser.add_argument("--doubles", action="store_true", help="uniquement les pages marquées comme doublon")
+    parser.add_argument("--score-below", type=float, help="uniquement les pages dont le Score est inférieur")
+    args = parser.parse_args()
+    clean_database(filter=combine_filters(
+        date_before(args.before) if args.before else None,
+        is_double() if args.doubles else None,
+        score_below(args.score_below) if args.score_below is not None else None,
+    ))
@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+import logging
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from http_client import get_session
+from rate_limiter import TokenBucket, retry_after_seconds, backoff_delay
+from metrics import increment
+
+logger = logging.getLogger(__name__)
+
+NOTION_VERSION = "2022-06-28"
+DEFAULT_NOTION_API_URL = "https://api.notion.com/v1"
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+
+def _read_number_env(name, default):
+    try:
+        return float(os.getenv(name, str(default)).split('#')[0].strip())
+    except ValueError:
+        return default
+
+def get_notion_api_url():
+    """URL de l'API Notion (NOTION_API_URL permet de viser un serveur local)"""
+    return os.getenv("NOTION_API_URL", DEFAULT_NOTION_API_URL).rstrip('/')
+
+def get_database_id():
+    return os.getenv("NOTION_DATABASE_ID")
+
+def notion_headers():
+    return {
+        "Authorization": f"Bearer {os.getenv('NOTION_API_KEY')}",
+        "Content-Type": "application/json",
+        "Notion-Version": NOTION_VERSION
+    }
+
+_bucket = None
+_bucket_lock = threading.Lock()
+
+def get_notion_bucket():
+    """Seau à jetons commun à tous les appels Notion (NOTION_RATE_LIMIT req/s, NOTION_RATE_BURST en rafale)"""
+    global _bucket
+    with _bucket_lock:
+        if _bucket is None:
+            _bucket = TokenBucket(
+                rate=_read_number_env("NOTION_RATE_LIMIT", 3),
+                capacity=_read_number_env("NOTION_RATE_BURST", 3)
+            )
+        return _bucket
+
+def reset_notion_bucket():
+    """Oublie le seau à jetons (il sera recréé avec la configuration courante)"""
+    global _bucket
+    with _bucket_lock:
+        _bucket = None
+
+def _request_not_sent(error):
+    """Indique si la requête n'a jamais atteint le serveur (connexion impossible)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), urllib3.exceptions.NewConnectionError)
+    return False
+
+def notion_request(method, path, json=None, params=None, max_retries=None, idempotent=None):
+    """Envoie une requête à l'API Notion en respectant sa limite de débit
+
+    Chaque tentative attend un jeton du seau commun. Sur un 429, le délai
+    Retry-After est appliqué à tous les appelants. Une requête idempotente (tout
+    sauf POST par défaut) est aussi renvoyée après une erreur 5xx ou réseau, avec
+    un délai exponentiel avec gigue. Une requête non idempotente (création de page)
+    n'est renvoyée que si elle n'a pas pu partir, pour ne jamais créer deux pages :
+    le disjoncteur et la file d'attente des pages gèrent les autres erreurs.
+    Retourne la dernière réponse (les erreurs réseau de la dernière tentative sont levées).
+    """
+    if idempotent is None:
+        idempotent = method.upper() != "POST"
+    if max_retries is None:
+        max_retries = int(_read_number_env("NOTION_MAX_RETRIES", 5))
+    bucket = get_notion_bucket()
+    url = get_notion_api_url() + path
+    response = None
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            response = get_session().request(method, url, headers=notion_headers(), json=json, params=params)
+        except requests.RequestException as e:
+            increment("notion_requests", method=method, status="network_error")
+            if attempt == max_retries or not (idempotent or _request_not_sent(e)):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Erreur réseau Notion ({str(e)}), nouvelle tentative dans {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        increment("notion_requests", method=method, status=response.status_code)
+        if response.status_code == 429 and attempt < max_retries:
+            delay = retry_after_seconds(response.headers)
+            delay = delay if delay is not None else backoff_delay(attempt)
+            logger.warning(f"Limite Notion atteinte (429), pause de {delay:.1f}s")
+            bucket.pause(delay)
+            continue
+        if response.status_code in RETRYABLE_STATUSES and idempotent and attempt < max_retries:
+            delay = backoff_delay(attempt)
+            logger.warning(f"Erreur Notion {response.status_code}, nouvelle tentative dans {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        return response
+    return response
+
+def notion_map(func, items, max_workers=None):
+    """Applique func à chaque élément en parallèle ; le débit reste limité par le seau commun"""
+    if max_workers is None:
+        max_workers = int(_read_number_env("NOTION_BULK_WORKERS", 4))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(func, items))
@@ -1,37 +1,85 @@
 import os
 import json
-import requests
+from notion_client import notion_request, get_database_id
+from image_store import get_image_store, get_target_bytes
 from dotenv import load_dotenv
 import base64
-from io import BytesIO
-from PIL import Image
-import html
-import re
-
-load_dotenv()
-
-NOTION_API_URL = "https://api.notion.com/v1"
-NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-NOTION_API_KEY = os.getenv("NOTION_API_KEY")
-
-def check_notion_connection():
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
+import threading
+import time
+from circuit_breaker import CircuitBreaker
+from text_normalizer import clean_text
+from metrics import timed
+
+# Propriétés de la base utilisées par create_notion_page
+REQUIRED_PROPERTIES = ["Title", "URL", "Flux", "Date", "Contenu", "Commercial", "Score", "Résumé", "Tags", "Double"]
+PENDING_PAGES_FILE = "pending_notion_pages.jsonl"
+
+def _read_number_env(name, default):
+    try:
+        return float(os.getenv(name, str(default)).split('#')[0].strip())
+    except ValueError:
+        return default
+
+# Résultat de la dernière vérification de connexion, partagé par le processus
+_connection_status = {"ok": None, "checked_at": 0.0}
+_connection_lock = threading.Lock()
+_pending_lock = threading.Lock()
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+def get_notion_breaker():
+    """Disjoncteur des créations de pages (NOTION_BREAKER_THRESHOLD échecs, NOTION_BREAKER_COOLDOWN secondes)
+
+    Créé au premier usage, une fois le .env chargé.
+    """
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                "Notion",
+                failure_threshold=int(_read_number_env("NOTION_BREAKER_THRESHOLD", 5)),
+                cooldown=_read_number_env("NOTION_BREAKER_COOLDOWN", 120)
+            )
+        return _breaker
+
+def reset_notion_breaker():
+    """Oublie le disjoncteur (il sera recréé avec la configuration courante)"""
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
+
+def check_notion_connection(force=False):
+    """Vérifie la connexion et le schéma de la base Notion, avec un résultat en cache
+
+    La vérification n'est refaite qu'après NOTION_HEALTH_TTL secondes (une fois
+    par exécution en pratique) ; un échec n'est gardé en cache que 60 secondes.
+    """
+    with _connection_lock:
+        ttl = _read_number_env("NOTION_HEALTH_TTL", 3600)
+        if _connection_status["ok"] is False:
+            ttl = min(ttl, 60)
+        age = time.monotonic() - _connection_status["checked_at"]
+        if not force and _connection_status["ok"] is not None and age < ttl:
+            return _connection_status["ok"]
+        _connection_status["ok"] = _check_notion_database()
+        _connection_status["checked_at"] = time.monotonic()
+        return _connection_status["ok"]
+
+def _check_notion_database():
     try:
-        response = requests.get(
-            f"{NOTION_API_URL}/databases/{NOTION_DATABASE_ID}",
-            headers=headers
-        )
+        response = notion_request("GET", f"/databases/{get_database_id()}")
         if response.status_code == 200:
             print("Connexion à Notion réussie!")
+            properties = response.json().get("properties", {})
+            missing = [name for name in REQUIRED_PROPERTIES if name not in properties]
+            if missing:
+                print(f"Attention: propriétés absentes de la base Notion: {', '.join(missing)}")
             return True
         else:
             print(f"Erreur de connexion à Notion: {response.status_code}")
-            print(f"Message: {response.json().get('message', 'Pas de message d\'erreur')}")
+            message = response.json().get('message', "Pas de message d'erreur")
+            print(f"Message: {message}")
             return False
     except Exception as e:
         print(f"Erreur lors de la vérification de la connexion: {str(e)}")
@@ -103,6 +151,9 @@ def split_content_for_notion(text, max_chunk_size=1800):
 
 def optimize_image(img, max_size=(800, 800), quality=85):
     """Redimensionne et optimise une image"""
+    from io import BytesIO
+    from PIL import Image
+
     # Redimensionner l'image en gardant les proportions
     img.thumbnail(max_size, Image.Resampling.LANCZOS)
     
@@ -116,59 +167,75 @@ def optimize_image(img, max_size=(800, 800), quality=85):
     return buffer.getvalue()
 
 def download_and_prepare_image(image_url):
-    """Télécharge l'image et la prépare pour Notion"""
+    """Télécharge l'image et la prépare pour Notion
+
+    Non utilisée par le pipeline : la couverture des pages est une URL externe
+    (l'image d'origine, ou le lien Imgur pour JVC), que Notion télécharge lui-même.
+    """
     try:
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        
-        # Ouvrir l'image avec PIL
-        img = Image.open(BytesIO(response.content))
-        
-        # Optimiser l'image
-        img_data = optimize_image(img)
+        # Téléchargement et redimensionnement en cache (une seule fois par image)
+        img_data = get_image_store().prepare(image_url, max_size=(800, 800), target_bytes=get_target_bytes())
         
         # Encoder en base64
-        encoded = base64.b64encode(img_data).decode()
-        
-        # Vérifier la taille finale
-        size_kb = len(encoded) / 1024
-        if size_kb > 500:  # Si toujours trop grand
-            print(f"Image trop grande ({size_kb:.1f}KB), nouvelle tentative avec compression plus forte")
-            img_data = optimize_image(img, max_size=(600, 600), quality=60)
-            encoded = base64.b64encode(img_data).decode()
-        
-        return encoded
+        return base64.b64encode(img_data).decode()
     except Exception as e:
         print(f"Erreur lors du téléchargement de l'image: {str(e)}")
         return None
 
-def clean_text(text):
-    """Nettoie le texte des caractères HTML encodés et autres caractères spéciaux"""
-    if not text:
-        return ""
-    
-    # Décode les entités HTML (comme &quot;, &#039;, etc.)
-    text = html.unescape(text)
-    
-    # Nettoie les codes HTML numériques restants (comme &#0039;)
-    text = re.sub(r'&#\d+;', "'", text)
-    
-    # Supprime les caractères de contrôle
-    text = ''.join(char for char in text if ord(char) >= 32 or char in '\n\t')
-    
-    return text.strip()
+def is_retryable_status(status_code):
+    """Erreurs temporaires (réseau, 429, 5xx) pour lesquelles la page peut être renvoyée plus tard"""
+    return status_code is None or status_code == 429 or status_code >= 500
+
+def queue_pending_page(job):
+    """Met de côté un article dont la page n'a pas pu être créée (Notion indisponible)"""
+    with _pending_lock:
+        with open(PENDING_PAGES_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(job, ensure_ascii=False) + "\n")
+    print(f"Page mise en attente pour plus tard: {job.get('entry', {}).get('title')}")
+
+def take_pending_pages():
+    """Retire et retourne les articles en attente de création de page"""
+    with _pending_lock:
+        if not os.path.exists(PENDING_PAGES_FILE):
+            return []
+        jobs = []
+        with open(PENDING_PAGES_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    jobs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        os.remove(PENDING_PAGES_FILE)
+        return jobs
+
+def _response_body(response):
+    """Corps JSON de la réponse, ou son texte (page d'erreur HTML d'un proxy...)"""
+    try:
+        body = response.json()
+    except ValueError:
+        return {"message": response.text}
+    return body if isinstance(body, dict) else {"message": body}
 
+@timed("create_notion_page")
 def create_notion_page(title, content, analysis, image_url=None, article_url=None, published_date=None, author=None, is_double=False):
+    notion_breaker = get_notion_breaker()
+    permission = notion_breaker.allow_request()
+    if not permission:
+        print("Notion indisponible (disjoncteur ouvert), page non envoyée")
+        return None, None
+    try:
+        return _create_notion_page(title, content, analysis, image_url, article_url, published_date, author)
+    finally:
+        # Un essai du disjoncteur interrompu sans succès ni échec enregistré ne doit pas le bloquer
+        notion_breaker.end_trial(permission)
+
+def _create_notion_page(title, content, analysis, image_url, article_url, published_date, author):
+    notion_breaker = get_notion_breaker()
     if not check_notion_connection():
         print("Impossible de se connecter à la base de données Notion")
+        notion_breaker.record_failure()
         return None, None
 
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-
     # Nettoyer le titre et le contenu
     clean_title = clean_text(title)
     clean_content = clean_text(content)
@@ -265,7 +332,7 @@ def create_notion_page(title, content, analysis, image_url=None, article_url=Non
         }
 
     data = {
-        "parent": {"database_id": NOTION_DATABASE_ID},
+        "parent": {"database_id": get_database_id()},
         "properties": properties,
         "cover": {
             "type": "external",
@@ -276,17 +343,29 @@ def create_notion_page(title, content, analysis, image_url=None, article_url=Non
     }
 
     try:
-        response = requests.post(NOTION_API_URL + "/pages", headers=headers, json=data)
-        if response.status_code == 200:
-            # Ajouter l'ID de la page créée dans la réponse
-            return response.status_code, {"id": response.json()["id"]}
-        return response.status_code, response.json()
+        response = notion_request("POST", "/pages", json=data)
     except Exception as e:
         print(f"Erreur lors de l'envoi à Notion: {str(e)}")
+        notion_breaker.record_failure()
         return None, None
 
+    # Un seul résultat enregistré par réponse, même si son corps n'est pas du JSON
+    if response.status_code == 200:
+        notion_breaker.record_success()
+    elif is_retryable_status(response.status_code):
+        notion_breaker.record_failure()
+    else:
+        # Erreur propre à la page (400, 404...) : Notion répond, le disjoncteur peut se refermer
+        notion_breaker.record_success()
+    body = _response_body(response)
+    if response.status_code == 200:
+        # Ajouter l'ID de la page créée dans la réponse
+        return response.status_code, {"id": body.get("id")}
+    return response.status_code, body
+
 # Exemple d'utilisation
 if __name__ == "__main__":
+    load_dotenv()
     title = "Exemple de titre"
     content = "Voici un exemple de contenu d'article."
     analysis = '{"isCommercial": false, "significanceScore": 7.5, "summary": "Résumé de l\'article.", "tags": ["Technologie", "Innovation"]}'
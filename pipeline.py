@@ -0,0 +1,82 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class Stage:
+    """Étape du pipeline : une fonction appliquée par un nombre fixe de workers
+
+    La fonction reçoit un élément et retourne l'élément à transmettre à l'étape
+    suivante, ou None pour l'abandonner.
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+def run_pipeline(items, stages, queue_size=10):
+    """Exécute les étapes en parallèle, reliées par des files bornées
+
+    Chaque étape consomme la file de l'étape précédente avec ses propres workers,
+    si bien que l'élément N+1 est traité par la première étape pendant que
+    l'élément N est dans la deuxième. Les files bornées limitent le nombre
+    d'éléments en attente entre deux étapes. Retourne les éléments sortis de
+    la dernière étape (dans l'ordre de fin de traitement).
+    """
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results = []
+    results_lock = threading.Lock()
+    threads = []
+
+    for index, stage in enumerate(stages):
+        input_queue = queues[index]
+        output_queue = queues[index + 1] if index + 1 < len(stages) else None
+        next_workers = stages[index + 1].workers if output_queue is not None else 0
+        remaining = {"workers": stage.workers}
+        remaining_lock = threading.Lock()
+
+        def worker(stage=stage, input_queue=input_queue, output_queue=output_queue,
+                   next_workers=next_workers, remaining=remaining, remaining_lock=remaining_lock):
+            while True:
+                item = input_queue.get()
+                if item is _STOP:
+                    break
+                try:
+                    output = stage.func(item)
+                except Exception as e:
+                    logger.error(f"Erreur dans l'étape {stage.name}: {str(e)}")
+                    output = None
+                if output is None:
+                    continue
+                if output_queue is not None:
+                    output_queue.put(output)
+                else:
+                    with results_lock:
+                        results.append(output)
+
+            # Le dernier worker de l'étape arrête l'étape suivante
+            with remaining_lock:
+                remaining["workers"] -= 1
+                last_worker = remaining["workers"] == 0
+            if last_worker and output_queue is not None:
+                for _ in range(next_workers):
+                    output_queue.put(_STOP)
+
+        for worker_index in range(stage.workers):
+            thread = threading.Thread(target=worker, name=f"{stage.name}-{worker_index}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    for item in items:
+        queues[0].put(item)
+    for _ in range(stages[0].workers):
+        queues[0].put(_STOP)
+
+    for thread in threads:
+        thread.join()
+
+    return results
@@ -0,0 +1,160 @@
+import os
+import threading
+
+# À incrémenter à chaque modification du prompt (invalide le cache des analyses)
+PROMPT_VERSION = "2"
+
+SYSTEM_PROMPT = "Tu es un assistant spécialisé dans l'analyse d'articles d'actualité."
+
+PROMPT_HEADER = """Tu es un assistant spécialisé dans l'analyse d'articles d'actualité.
+Tu réponds uniquement au format JSON demandé.
+
+=== Article à analyser ===
+"""
+
+PROMPT_INSTRUCTIONS = """=== Critères d'analyse ===
+1. SIMILARITÉ
+- Vérifier si l'article est similaire à un des articles récents listés
+- Un article est considéré comme similaire s'il traite du même sujet principal
+- Prendre en compte le titre et le contenu
+
+2. CONTENU COMMERCIAL
+- Mots promotionnels: "promo", "promotion", "offre", "soldes", "réduction"
+- Symboles monétaires et pourcentages
+- Mentions commerciales
+- Références temporelles
+- VPN et abonnements
+
+3. IMPORTANCE DE L'ARTICLE (0.0 à 10.0)
+4. RÉSUMÉ (factuel, très détaillés et précis)
+5. TAG principal (1 tag en français, commençant par une majuscule)
+
+Répondre EXACTEMENT dans ce format JSON:
+{
+  "isDouble": true/false,
+  "similarArticle": "titre de l'article similaire ou null",
+  "similarityReason": "explication courte de la similarité ou null",
+  "isCommercial": true/false,
+  "significanceScore": <nombre entre 0.0 et 10.0>,
+  "summary": "<résumé en français>",
+  "tags": ["tag1"]
+}
+"""
+
+COMPARISON_HEADER = "=== Articles précédents ===\n"
+
+DEFAULT_ENCODING = "o200k_base"
+TITLE_TOKEN_BUDGET = 100
+
+class ApproximateEncoder:
+    """Encodeur de secours (environ 4 caractères par token) si tiktoken est indisponible"""
+
+    chars_per_token = 4
+
+    def encode(self, text, disallowed_special=()):
+        step = self.chars_per_token
+        return [text[i:i + step] for i in range(0, len(text), step)]
+
+    def decode(self, tokens, errors="strict"):
+        return "".join(tokens)
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+def get_encoder(model):
+    """Retourne l'encodeur tiktoken du modèle, chargé une seule fois par processus"""
+    with _encoders_lock:
+        encoder = _encoders.get(model)
+        if encoder is None:
+            try:
+                # Import différé : tiktoken n'est chargé que si un prompt doit être compté
+                import tiktoken
+                try:
+                    encoder = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoder = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                # Fichiers d'encodage non téléchargeables (hors ligne, proxy...)
+                print(f"Erreur lors du chargement de l'encodeur tiktoken, estimation utilisée: {e}")
+                encoder = ApproximateEncoder()
+            _encoders[model] = encoder
+        return encoder
+
+def count_tokens(text, model):
+    """Compte le nombre de tokens dans un texte"""
+    if not text:
+        return 0
+    return len(get_encoder(model).encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text, max_tokens, model):
+    """Tronque un texte à max_tokens tokens, retourne (texte, nombre de tokens)"""
+    if not text or max_tokens <= 0:
+        return "", 0
+    encoder = get_encoder(model)
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    # Le décodage d'une coupure au milieu d'un caractère multi-octets est ignoré
+    return encoder.decode(tokens[:max_tokens], errors="ignore"), max_tokens
+
+def get_token_budgets():
+    """Budgets de tokens par section du prompt (configurables dans le .env)"""
+    def read_int(name, default):
+        try:
+            return int(os.getenv(name, str(default)).split('#')[0].strip())
+        except ValueError:
+            return default
+    return {
+        "body": read_int("PROMPT_BODY_TOKENS", 800),
+        "comparison": read_int("PROMPT_COMPARISON_TOKENS", 400),
+        "max_total": read_int("PROMPT_MAX_TOKENS", 2000),
+    }
+
+def build_comparison_section(similar_titles, max_tokens, model):
+    """Liste des articles similaires, limitée à max_tokens (articles entiers uniquement)"""
+    if not similar_titles or max_tokens <= 0:
+        return "", 0
+    used = count_tokens(COMPARISON_HEADER, model)
+    lines = []
+    for i, title in enumerate(similar_titles, 1):
+        line = f"{i}. {title}\n"
+        line_tokens = count_tokens(line, model)
+        if used + line_tokens > max_tokens:
+            break
+        lines.append(line)
+        used += line_tokens
+    if not lines:
+        return "", 0
+    return COMPARISON_HEADER + "".join(lines), used
+
+def build_analysis_prompt(title, content, similar_titles, model, budgets=None):
+    """Construit le prompt d'analyse dans le respect des budgets de tokens
+
+    Retourne (prompt, tokens) où tokens donne le nombre de tokens réellement
+    utilisés par section (instructions, titre, contenu, comparaison, total).
+    Le contenu reçoit ce qu'il reste sous le plafond PROMPT_MAX_TOKENS, dans la
+    limite de PROMPT_BODY_TOKENS.
+    """
+    budgets = budgets or get_token_budgets()
+    instructions_tokens = count_tokens(PROMPT_HEADER, model) + count_tokens(PROMPT_INSTRUCTIONS, model) + count_tokens(SYSTEM_PROMPT, model)
+    title_text, title_tokens = truncate_to_tokens(title or "", TITLE_TOKEN_BUDGET, model)
+    comparison_text, comparison_tokens = build_comparison_section(similar_titles, budgets["comparison"], model)
+
+    remaining = budgets["max_total"] - instructions_tokens - title_tokens - comparison_tokens
+    body_text, body_tokens = truncate_to_tokens(content or "", min(budgets["body"], remaining), model)
+
+    prompt = (
+        PROMPT_HEADER
+        + f"TITRE: {title_text}\n"
+        + f"CONTENU: {body_text}\n\n"
+        + (comparison_text + "\n" if comparison_text else "")
+        + PROMPT_INSTRUCTIONS
+    )
+    tokens = {
+        "instructions": instructions_tokens,
+        "title": title_tokens,
+        "body": body_tokens,
+        "comparison": comparison_tokens,
+        "total": count_tokens(prompt, model) + count_tokens(SYSTEM_PROMPT, model),
+    }
+    return prompt, tokens
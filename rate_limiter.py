@@ -0,0 +1,105 @@
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+class TokenBucket:
+    """Seau à jetons thread-safe : rate jetons par seconde, au plus capacity en réserve
+
+    acquire() bloque jusqu'à ce que les jetons soient disponibles ; pause() bloque
+    tous les appelants pendant un délai imposé par le serveur (Retry-After).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Attend que amount jetons soient disponibles puis les consomme"""
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                else:
+                    wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Bloque toutes les acquisitions pendant seconds secondes"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+class RateLimiter:
+    """Limiteur combinant requêtes par minute et tokens par minute"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute / 60.0, capacity=max(1, requests_per_minute / 60.0 * 10))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, capacity=tokens_per_minute / 6.0) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        self.requests.acquire()
+        if self.tokens is not None and tokens:
+            self.tokens.acquire(tokens)
+
+    def pause(self, seconds):
+        self.requests.pause(seconds)
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+def parse_duration(value):
+    """Convertit une durée du type '1m30s', '20ms' ou '2.5' en secondes"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def retry_after_seconds(headers):
+    """Délai d'attente indiqué par le serveur (Retry-After, retry-after-ms, x-ratelimit-reset-*)"""
+    if not headers:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        seconds = parse_duration(retry_after)
+        if seconds is not None:
+            return seconds
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    resets = [parse_duration(headers.get(name)) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+def backoff_delay(attempt, base=1.0, maximum=60.0):
+    """Délai exponentiel avec gigue pour la tentative attempt (0, 1, 2...)"""
+    return min(maximum, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
@@ -2,14 +2,19 @@ import feedparser
 from datetime import datetime
 import time
 import re
-import json
 import os
 import logging
 from scraper import extract_main_image, get_full_article  # Ajout de l'import
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
+import threading
+from http_client import http_get
 from dotenv import load_dotenv
+from feed_cache import get_feed_cache, content_hash
+from image_url_cache import get_image_url_cache
+from feed_stream import iter_feed_entries, LXML_AVAILABLE
+from image_filter import is_valid_image_url
+from metrics import timed, increment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,79 +37,122 @@ def is_problematic_domain(domain):
             return True
     return False
 
-IMAGE_CACHE_FILE = 'image_cache.json'
 RSS_CACHE_DURATION = 300  # 5 minutes en secondes
+IMG_SRC_PATTERN = re.compile(r'<img[^>]+src=[\'"](https?://[^\'"]+)[\'"]')
+FEED_REQUEST_HEADERS = {
+    'Accept': 'application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.8, */*;q=0.5'
+}
 
-@lru_cache(maxsize=100)
-def parse_feed_cached(url):
-    """Cache les résultats du parsing RSS pour 5 minutes"""
-    return feedparser.parse(url)
+def get_rss_cache_duration():
+    """Durée de validité du cache des flux (RSS_CACHE_DURATION dans le .env)"""
+    try:
+        return int(os.getenv("RSS_CACHE_DURATION", str(RSS_CACHE_DURATION)).split('#')[0].strip())
+    except ValueError:
+        return RSS_CACHE_DURATION
 
-def load_image_cache():
-    if os.path.exists(IMAGE_CACHE_FILE):
+def count_new_entries(entries, is_processed=None):
+    """Nombre d'entrées pas encore traitées"""
+    if is_processed is None:
+        return len(entries)
+    return sum(1 for entry in entries if not is_processed(entry['link']))
+
+def parse_feed_entries(body, url, content_type='application/xml', max_entries=None, is_processed=None):
+    """Parse un flux et retourne (entrées, complet)
+
+    Avec max_entries, le flux est lu progressivement et la lecture s'arrête dès
+    que max_entries entrées non traitées (selon is_processed) ont été trouvées ;
+    complet vaut alors False. Sans lxml, ou si le flux n'est pas du XML bien
+    formé, le flux entier est parsé par feedparser.
+    """
+    if max_entries is not None and LXML_AVAILABLE:
         try:
-            with open(IMAGE_CACHE_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_image_cache(cache):
-    with open(IMAGE_CACHE_FILE, 'w') as f:
-        json.dump(cache, f)
-
-def is_valid_image_url(url):
-    """Vérifie si l'URL de l'image est valide et n'est pas un logo"""
-    if not url:
-        return False
-        
-    # Liste des motifs à exclure
-    excluded_patterns = [
-        'logo', 
-        'logos',  # Exclude URLs containing "logos"
-        'favicon',
-        'fzn',
-        'header',
-        'footer',
-        'icon',
-        'banner',
-        '-min.png',  # Format courant pour les logos minifiés
-        'site-icon',
-        'site-logo',
-        'brand'
-    ]
-    
-    # Vérifier si l'URL contient un des motifs exclus
-    url_lower = url.lower()
-    for pattern in excluded_patterns:
-        if pattern in url_lower:
-            return False
-            
-    # Vérifier la taille minimale (pour éviter les icônes)
-    if 'icon' in url_lower or any(dim in url_lower for dim in ['16x16', '32x32', '64x64']):
-        return False
+            entries = []
+            new_count = 0
+            for entry in iter_feed_entries(body, url, content_type):
+                item = extract_entry(entry, url)
+                entries.append(item)
+                if is_processed is None or not is_processed(item['link']):
+                    new_count += 1
+                    if new_count >= max_entries:
+                        return entries, False
+            if entries:
+                return entries, True
+        except Exception as e:
+            logger.warning(f"Lecture progressive impossible pour {url} ({str(e)}), lecture complète du flux")
 
-    # Vérifier les extensions d'image typiques des logos
-    if url_lower.endswith(('.ico', '.svg')):
-        return False
-        
-    return True
+    feed = feedparser.parse(body, response_headers={
+        'content-location': url,
+        'content-type': content_type
+    })
+    return extract_feed_entries(feed, url), True
+
+def parse_feed_cached(url, max_entries=None, is_processed=None):
+    """Récupère les entrées d'un flux en passant par le cache persistant
+
+    Le flux n'est pas téléchargé tant que le cache est valide (RSS_CACHE_DURATION).
+    Ensuite une requête conditionnelle (ETag / Last-Modified) est envoyée : sur un 304
+    ou un contenu identique (même empreinte), le parsing est ignoré et les entrées
+    en cache sont réutilisées.
+    Le cache peut ne contenir que le début du flux (lecture arrêtée à max_entries
+    entrées nouvelles) : s'il n'y a plus assez d'entrées nouvelles dedans, le flux
+    est de nouveau téléchargé et lu plus loin.
+    """
+    cache = get_feed_cache(ttl=get_rss_cache_duration())
+    cached = cache.get(url)
+
+    def has_enough(cached):
+        return (cached.get("complete", True) or max_entries is None
+                or count_new_entries(cached["entries"], is_processed) >= max_entries)
+
+    usable = bool(cached) and has_enough(cached)
+    if usable and cache.is_fresh(cached):
+        logger.info(f"Flux servi depuis le cache: {url}")
+        return cached["entries"]
+
+    headers = dict(FEED_REQUEST_HEADERS)
+    if usable:
+        headers.update(cache.conditional_headers(cached))
+    response = http_get(url, headers=headers)
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if response.status_code == 304 and usable:
+        logger.info(f"Flux inchangé (304): {url}")
+        cache.touch(url, etag, last_modified)
+        return cached["entries"]
+    response.raise_for_status()
+
+    body_hash = content_hash(response.content)
+    if usable and cached.get("content_hash") == body_hash:
+        logger.info(f"Flux inchangé (contenu identique): {url}")
+        cache.touch(url, etag, last_modified)
+        return cached["entries"]
+
+    entries, complete = parse_feed_entries(
+        response.content, url,
+        content_type=response.headers.get('Content-Type', 'application/xml'),
+        max_entries=max_entries,
+        is_processed=is_processed
+    )
+    cache.update(url, entries, body_hash, etag, last_modified, complete=complete)
+    return entries
+
+def load_image_cache():
+    """Retourne le cache partagé des images d'articles"""
+    return get_image_url_cache()
+
+def save_image_cache(cache=None):
+    (cache or get_image_url_cache()).save()
 
 def extract_image_from_html(html_content):
     """Extrait l'URL de la première image valide d'un contenu HTML"""
     if not html_content:
         return None
         
-    # Recherche toutes les balises img avec src
-    img_pattern = r'<img[^>]+src=[\'"](https?://[^\'"]+)[\'"]'
-    matches = re.finditer(img_pattern, html_content)
-    
-    # Teste chaque image jusqu'à en trouver une valide
-    for match in matches:
-        image_url = match.group(1)
+    # Première image valide parmi les balises img avec src
+    for image_url in IMG_SRC_PATTERN.findall(html_content):
         if is_valid_image_url(image_url):
             return image_url
-            
     return None
 
 def parse_date(entry):
@@ -146,23 +194,25 @@ def parse_date(entry):
 
     return None
 
-def process_entry_image(entry, image_cache):
+def process_entry_image(entry, image_cache=None):
     """Traite l'extraction d'image pour une entrée"""
-    if entry.link in image_cache:
-        return image_cache[entry.link]
+    image_cache = image_cache or get_image_url_cache()
+    found, cached_image = image_cache.lookup(entry.link)
+    if found:
+        return cached_image
         
     domain = urlparse(entry.link).netloc
     if is_problematic_domain(domain):
         logger.info(f"Scraping image for problematic domain: {domain}")
         scraped_image = extract_main_image(entry.link)
         if scraped_image and is_valid_image_url(scraped_image):
-            image_cache[entry.link] = scraped_image
+            image_cache.put(entry.link, scraped_image)
             return scraped_image
+        # Mise en cache de l'absence d'image (durée plus courte)
+        image_cache.put(entry.link, None)
     return None
 
-load_dotenv()
-
-def process_single_entry(entry, image_cache):
+def process_single_entry(entry, image_cache=None):
     """Traite un seul article et retourne l'entrée mise à jour"""
     logger.info(f"Processing entry: {entry.link}")
     # Nettoyage du titre
@@ -204,67 +254,125 @@ def process_single_entry(entry, image_cache):
     entry.published_date = parse_date(entry)
     return entry
 
-def fetch_rss_feed(url):
-    logger.info(f"Fetching RSS feed from URL: {url}")
-    feed = parse_feed_cached(url)
-    entries = []
+def extract_entry(entry, url):
+    """Convertit une entrée feedparser en dictionnaire sérialisable"""
+    image_url = None
     
-    for entry in feed.entries:
-        image_url = None
-        
-        # Special handling for jeuxvideo.com images
-        if 'jeuxvideo.com' in url:
-            if hasattr(entry, 'enclosures') and entry.enclosures:
-                for enclosure in entry.enclosures:
-                    if enclosure.type and enclosure.type.startswith('image/'):
-                        original_image_url = enclosure.get('url') or enclosure.get('href')
-                        if original_image_url:
-                            logger.info(f"Found JVC image in enclosure: {original_image_url}")
-                            entry.image_from_enclosure = True
-                            # Use the original URL for now, the actual upload will happen in process_image_url
-                            image_url = original_image_url
-                            break
-
-        if not image_url:
-            # Default image handling for other sources
-            if hasattr(entry, 'enclosures') and entry.enclosures:
-                for enclosure in entry.enclosures:
-                    if enclosure.type and enclosure.type.startswith('image/'):
-                        image_url = enclosure.get('url') or enclosure.get('href')
-                        logger.info(f"Found image in enclosure: {image_url}")
+    # Special handling for jeuxvideo.com images
+    if 'jeuxvideo.com' in url:
+        if hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if enclosure.type and enclosure.type.startswith('image/'):
+                    original_image_url = enclosure.get('url') or enclosure.get('href')
+                    if original_image_url:
+                        logger.info(f"Found JVC image in enclosure: {original_image_url}")
+                        entry.image_from_enclosure = True
+                        # Use the original URL for now, the actual upload will happen in process_image_url
+                        image_url = original_image_url
                         break
 
-            if not image_url:
-                image_url = getattr(entry, 'image_url', None)
-        
-        entries.append({
-            'title': entry.title,
-            'link': entry.link,
-            'summary': entry.summary,
-            'published_date': parse_date(entry),
-            'image_url': image_url,
-            'is_jvc_enclosure': getattr(entry, 'image_from_enclosure', False)
-        })
+    if not image_url:
+        # Default image handling for other sources
+        if hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if enclosure.type and enclosure.type.startswith('image/'):
+                    image_url = enclosure.get('url') or enclosure.get('href')
+                    logger.info(f"Found image in enclosure: {image_url}")
+                    break
+
+        if not image_url:
+            image_url = getattr(entry, 'image_url', None)
     
+    return {
+        'title': entry.title,
+        'link': entry.link,
+        'summary': entry.summary,
+        'published_date': parse_date(entry),
+        'image_url': image_url,
+        'is_jvc_enclosure': getattr(entry, 'image_from_enclosure', False)
+    }
+
+def extract_feed_entries(feed, url):
+    """Convertit les entrées feedparser en dictionnaires sérialisables"""
+    return [extract_entry(entry, url) for entry in feed.entries]
+
+@timed("fetch_rss_feed")
+def fetch_rss_feed(url, max_entries=None, is_processed=None):
+    """Entrées d'un flux ; avec max_entries, la lecture s'arrête après max_entries entrées non traitées"""
+    logger.info(f"Fetching RSS feed from URL: {url}")
+    entries = parse_feed_cached(url, max_entries=max_entries, is_processed=is_processed)
+    increment("feed_entries", len(entries))
     logger.info(f"Finished fetching RSS feed from URL: {url}")
     return entries
 
-def get_article_content(url):
-    """Récupère le contenu complet d'un article et son image à la demande"""
+def fetch_all_feeds(feeds, max_workers=8, max_per_host=2, max_entries=None, is_processed=None):
+    """Récupère tous les flux RSS en parallèle et retourne une liste de (feed, entries)
+
+    Le nombre total de téléchargements simultanés est limité par max_workers,
+    et le nombre de téléchargements simultanés vers un même hôte par max_per_host.
+    L'ordre des flux est conservé dans le résultat. max_entries et is_processed
+    sont transmis à fetch_rss_feed. entries vaut None pour un flux dont la
+    récupération a échoué (délai dépassé, erreur HTTP...), à distinguer d'un flux vide.
+    """
+    if not feeds:
+        return []
+
+    host_semaphores = {}
+    for feed in feeds:
+        host = urlparse(feed["url"]).netloc
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.Semaphore(max(1, max_per_host))
+
+    def fetch_one(feed):
+        semaphore = host_semaphores[urlparse(feed["url"]).netloc]
+        with semaphore:
+            start = time.time()
+            try:
+                entries = fetch_rss_feed(feed["url"], max_entries=max_entries, is_processed=is_processed)
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération du flux {feed['name']}: {str(e)}")
+                entries = None
+            logger.info(f"Flux {feed['name']} récupéré en {time.time() - start:.2f}s")
+            return entries
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feeds)))) as executor:
+        results = list(executor.map(fetch_one, feeds))
+
+    try:
+        get_feed_cache().save()
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde du cache des flux: {str(e)}")
+
+    return list(zip(feeds, results))
+
+def get_article_content(url, entry=None):
+    """Récupère le contenu complet d'un article et son image à la demande
+
+    entry est l'entrée du flux de l'article (extract_entry) : son image
+    d'enclosure JVC est conservée à la place de l'image trouvée sur la page.
+    """
     logger.info(f"Fetching article content for URL: {url}")
     content, scraped_image_url = get_full_article(url)
     
-    # Ne pas écraser l'image JVC de l'enclosure
-    if 'jeuxvideo.com' in url:
-        # Rechercher l'entrée correspondante dans les articles déjà traités
-        for entry in fetch_rss_feed("https://www.jeuxvideo.com/rss/rss.xml"):
-            if entry['link'] == url and entry['is_jvc_enclosure']:
-                logger.info(f"Using JVC enclosure image instead of scraped image: {entry['image_url']}")
-                return {
-                    'url': url,
-                    'content': content,
-                    'image_url': entry['image_url']
-                }
+    # Mise à jour du cache des images (l'absence d'image n'est retenue que si la page a été lue)
+    image_cache = get_image_url_cache()
+    if scraped_image_url:
+        image_cache.put(url, scraped_image_url)
+    else:
+        found, cached_image = image_cache.lookup(url)
+        if found:
+            scraped_image_url = cached_image
+        elif content is not None:
+            image_cache.put(url, None)
+    
+    # Ne pas écraser l'image JVC de l'enclosure (déjà lue avec l'entrée, sans relire le flux)
+    if entry and entry.get('is_jvc_enclosure') and entry.get('image_url'):
+        logger.info(f"Using JVC enclosure image instead of scraped image: {entry['image_url']}")
+        return {
+            'url': url,
+            'content': content,
+            'image_url': entry['image_url']
+        }
     
     return {
         'url': url,
@@ -274,6 +382,7 @@ def get_article_content(url):
 
 # Exemple d'utilisation
 if __name__ == "__main__":
+    load_dotenv()
     url = "http://example.com/rss"
     entries = fetch_rss_feed(url)
     for entry in entries:
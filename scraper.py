@@ -1,8 +1,10 @@
-from bs4 import BeautifulSoup
-import requests
+from http_client import http_get
 import time
 import logging
-from article_tracker import clean_article_content
+from text_normalizer import clean_article_content
+from html_extractor import extract_article, extract_image, LXML_AVAILABLE
+from image_filter import is_valid_page_image_url, first_valid_image
+from metrics import timed, increment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,10 +15,16 @@ def extract_main_image(url, soup=None):
     try:
         logger.info(f"Extracting main image from URL: {url}")
         if not soup:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_get(url, timeout=10)
+            # Extraction rapide (lxml) si disponible, BeautifulSoup sinon
+            if LXML_AVAILABLE:
+                image_url = extract_image(response.text, url, is_valid_page_image_url)
+                if image_url:
+                    logger.info(f"Found main image: {image_url}")
+                else:
+                    logger.warning(f"No main image found for URL: {url}")
+                return image_url
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(response.text, 'html.parser')
 
         # Special handling for developpez.com
@@ -25,7 +33,7 @@ def extract_main_image(url, soup=None):
             content_images = soup.select('div[style*="text-align: center"] img[src*="/public/images/"]')
             if content_images:
                 image_url = content_images[0].get('src')
-                if image_url and is_valid_image_url(image_url):
+                if image_url and is_valid_page_image_url(image_url):
                     logger.info(f"Found developpez.com content image: {image_url}")
                     return image_url
 
@@ -56,10 +64,10 @@ def extract_main_image(url, soup=None):
                     return element['src']
         
         # If no image found, try to find the first valid image in the article body
-        for img in soup.find_all('img'):
-            if img.get('src') and is_valid_image_url(img.get('src')):
-                logger.info(f"Found image in article body: {img['src']}")
-                return img['src']
+        image_url = first_valid_image((img.get('src') for img in soup.find_all('img')), is_valid_page_image_url)
+        if image_url:
+            logger.info(f"Found image in article body: {image_url}")
+            return image_url
         
         logger.warning(f"No main image found for URL: {url}")
         return None
@@ -68,74 +76,51 @@ def extract_main_image(url, soup=None):
         logger.error(f"Erreur lors de l'extraction de l'image: {str(e)}")
         return None
 
-def is_valid_image_url(url):
-    """Vérifie si l'URL de l'image est valide et n'est pas un logo"""
-    if not url:
-        return False
-        
-    # Special case for developpez.com
-    if 'developpez.com' in url:
-        if '/public/images/' in url:
-            return True
-        if '/images/logos/' in url:
-            return False
-            
-    # Liste des motifs à exclure
-    excluded_patterns = [
-        'logo', 
-        'logos',
-        'favicon',
-        'fzn',
-        'header',
-        'footer',
-        'icon',
-        'banner',
-        '-min.png',
-        'site-icon',
-        'site-logo',
-        'brand'
-    ]
+def extract_article_with_soup(html, url):
+    """Extrait (contenu, image_url) d'une page HTML avec BeautifulSoup"""
+    # Import différé : BeautifulSoup ne sert qu'en secours de l'extraction lxml
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
     
-    for pattern in excluded_patterns:
-        if pattern in url:
-            return False
-            
-    return True
+    # Trouver l'image principale
+    image_url = extract_main_image(url, soup)
+    
+    # Trouver le contenu principal
+    content = None
+    for selector in [
+        'article', '.article-content', '.post-content', 
+        '[itemprop="articleBody"]', '.entry-content'
+    ]:
+        main_content = soup.select_one(selector)
+        if main_content:
+            content = clean_article_content(main_content)
+            break
+    
+    if not content:
+        content = clean_article_content(soup.get_text())
+    
+    return content, image_url
 
+@timed("get_full_article")
 def get_full_article(url):
     """Récupère le contenu complet d'un article et son image"""
     try:
         logger.info(f"Fetching full article from URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers)
+        response = http_get(url)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Trouver l'image principale
-        image_url = extract_main_image(url, soup)
-        
-        # Trouver le contenu principal
-        content = None
-        for selector in [
-            'article', '.article-content', '.post-content', 
-            '[itemprop="articleBody"]', '.entry-content'
-        ]:
-            main_content = soup.select_one(selector)
-            if main_content:
-                content = clean_article_content(main_content)
-                break
-        
-        if not content:
-            content = clean_article_content(soup.get_text())
+        # Un seul parsing lxml pour l'image et le contenu, BeautifulSoup en secours
+        extracted = extract_article(response.text, url, is_valid_page_image_url, clean_article_content)
+        if extracted is None:
+            extracted = extract_article_with_soup(response.text, url)
+        content, image_url = extracted
             
         logger.info(f"Successfully fetched article content from URL: {url}")
         return content, image_url
         
     except Exception as e:
         logger.error(f"Erreur lors du scraping de {url}: {e}")
+        increment("scrape_errors")
         return None, None
 
 # Exemple d'utilisation
@@ -0,0 +1,146 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from article_tracker import get_article_store
+
+STOPWORDS = set("""
+le la les un une des du de d l et ou en au aux ce ces cet cette son sa ses leur leurs
+pour par sur dans avec sans sous chez entre vers plus moins tres tout tous toute toutes
+est sont etre ete a ont avoir fait faire peut qui que quoi dont ne pas se s il ils elle
+elles on nous vous je tu y ca cela comme mais donc car si aussi deja encore bien apres
+avant ici voici voila the of and to in for on with is are new
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TITLE_WEIGHT = 2  # Les mots du titre comptent double
+
+def tokenize(text):
+    """Découpe un texte en mots normalisés (minuscules, sans accents ni mots vides)"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(text) if len(token) > 2 and token not in STOPWORDS]
+
+def article_terms(title, text):
+    """Fréquences des termes d'un article (titre pondéré + texte)"""
+    terms = Counter()
+    for token in tokenize(title):
+        terms[token] += TITLE_WEIGHT
+    terms.update(tokenize(text))
+    return terms
+
+class SimilarityIndex:
+    """Index TF-IDF local des articles traités pour la détection des doublons
+
+    L'index est mis à jour au fil des ajouts et suppressions du stockage des
+    articles ; une recherche ne parcourt que les articles qui partagent au
+    moins un terme avec l'article recherché (index inversé).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = {}   # url -> (titre, Counter des termes)
+        self._postings = {}    # terme -> set(url)
+        self._document_frequency = Counter()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, url, title, text):
+        """Ajoute ou remplace un article dans l'index"""
+        terms = article_terms(title, text)
+        with self._lock:
+            self._remove(url)
+            self._documents[url] = (title, terms)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(url)
+                self._document_frequency[term] += 1
+
+    def remove(self, url):
+        with self._lock:
+            self._remove(url)
+
+    def _remove(self, url):
+        document = self._documents.pop(url, None)
+        if document is None:
+            return
+        for term in document[1]:
+            urls = self._postings.get(term)
+            if urls is not None:
+                urls.discard(url)
+                if not urls:
+                    del self._postings[term]
+            self._document_frequency[term] -= 1
+            if self._document_frequency[term] <= 0:
+                del self._document_frequency[term]
+
+    def _idf(self, term, total):
+        return math.log((total + 1) / (self._document_frequency.get(term, 0) + 1)) + 1
+
+    def _weights(self, terms, total):
+        return {term: count * self._idf(term, total) for term, count in terms.items()}
+
+    def query(self, title, text, top_k=10, min_score=0.0):
+        """Retourne les top_k articles les plus proches : liste de (score, url, titre)"""
+        query_terms = article_terms(title, text)
+        with self._lock:
+            total = len(self._documents)
+            if not total or not query_terms:
+                return []
+            query_weights = self._weights(query_terms, total)
+            query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+
+            candidates = set()
+            for term in query_terms:
+                candidates.update(self._postings.get(term, ()))
+
+            results = []
+            for url in candidates:
+                document_title, document_terms = self._documents[url]
+                document_weights = self._weights(document_terms, total)
+                document_norm = math.sqrt(sum(weight * weight for weight in document_weights.values()))
+                dot = sum(weight * document_weights.get(term, 0.0) for term, weight in query_weights.items())
+                score = dot / (query_norm * document_norm) if query_norm and document_norm else 0.0
+                if score >= min_score:
+                    results.append((score, url, document_title))
+
+        results.sort(reverse=True)
+        return results[:top_k]
+
+    # Notifications du stockage des articles
+    def article_added(self, article):
+        self.add(article["url"], article.get("title", ""), article_summary(article))
+
+    def article_removed(self, article):
+        self.remove(article["url"])
+
+    def articles_reloaded(self, articles):
+        with self._lock:
+            self._documents = {}
+            self._postings = {}
+            self._document_frequency = Counter()
+        for article in articles:
+            self.article_added(article)
+
+def article_summary(article):
+    """Texte indexé pour un article traité : le résumé de l'analyse, sinon le début du contenu"""
+    analysis = article.get("analysis")
+    if isinstance(analysis, dict) and analysis.get("summary"):
+        return analysis["summary"]
+    return (article.get("content") or "")[:1000]
+
+_similarity_index = None
+_similarity_index_lock = threading.Lock()
+
+def get_similarity_index():
+    """Retourne l'index partagé, construit depuis le stockage des articles au premier appel"""
+    global _similarity_index
+    with _similarity_index_lock:
+        if _similarity_index is None:
+            index = SimilarityIndex()
+            get_article_store().subscribe(index)
+            _similarity_index = index
+        return _similarity_index
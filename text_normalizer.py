@@ -0,0 +1,64 @@
+import html
+import re
+
+# Bandeaux de cookies et de consentement retirés du contenu des articles
+BOILERPLATE_PATTERNS = [
+    r'Ce contenu est bloqué.*?Gérer mes choix',
+    r'Les informations recueillies sont destinées.*?politique Cookies',
+    r'En poursuivant votre navigation.*?cookies',
+    r'Vous gardez la possibilité.*?tout moment',
+]
+
+# Chaque motif commence par un texte fixe, ce qui permet au moteur regex une recherche
+# rapide ; une alternance unique de tous les motifs serait plus lente
+_HTML_TAG = re.compile(r'<[^>]+>')
+_BOILERPLATE = [re.compile(pattern, re.DOTALL) for pattern in BOILERPLATE_PATTERNS]
+_NUMERIC_ENTITY = re.compile(r'&#\d+;')
+# Caractères de contrôle, sauf tabulation et saut de ligne
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f]')
+
+# Guillemets normalisés en apostrophe. Des replace successifs sont bien plus rapides que
+# str.translate sur du texte non ASCII (voir benchmarks/bench_text_normalization.py)
+QUOTE_CHARACTERS = ('"', '“', '”', '«', '»')
+
+def clean_article_content(content):
+    """Nettoie le contenu d'un article des balises HTML et du texte indésirable"""
+    if not content:
+        return ""
+
+    # Si c'est un objet BeautifulSoup ou Tag, obtenir le texte
+    if hasattr(content, 'get_text'):
+        try:
+            content = content.get_text(separator=' ', strip=True)
+        except Exception:
+            content = str(content)
+
+    # Nettoyer les balises HTML restantes puis les bandeaux de cookies et de consentement
+    content = _HTML_TAG.sub(' ', str(content))
+    for pattern in _BOILERPLATE:
+        content = pattern.sub('', content)
+
+    # Espaces, tabulations et sauts de ligne réduits à un seul espace
+    return ' '.join(content.split())
+
+def clean_quotes(text):
+    """Nettoie et normalise les guillemets dans le texte"""
+    if not text:
+        return ""
+    for quote in QUOTE_CHARACTERS:
+        text = text.replace(quote, "'")
+    return text
+
+def clean_text(text):
+    """Nettoie le texte des caractères HTML encodés et autres caractères spéciaux"""
+    if not text:
+        return ""
+
+    # Décode les entités HTML (comme &quot;, &#039;, etc.)
+    text = html.unescape(text)
+
+    # Nettoie les codes HTML numériques restants (comme &#0039;)
+    text = _NUMERIC_ENTITY.sub("'", text)
+
+    # Supprime les caractères de contrôle
+    return _CONTROL_CHARS.sub('', text).strip()